@@ -4,7 +4,7 @@ import streamlit as st
 import requests
 import pandas as pd
 import uuid
-from PIL import Image
+from PIL import Image, ImageDraw, ImageFont
 import os
 from io import BytesIO
 
@@ -136,6 +136,60 @@ with tab1:
                 st.error(f"❌ Error: {str(e)}")
 
 # --- TAB 2: Manual Markup ---
+# Markup is stored server-side as a vector layer on the inspection; this tab
+# only sends the shapes added or removed, and the API composites them onto the
+# stored AI-annotated image (never a previously marked-up copy) on export.
+MARKUP_LAYER = "manual"
+# Line widths and text size are relative to a 1000px long side, as in
+# app/annotations.py, so the preview matches the exported image
+REFERENCE_SIDE = 1000
+TEXT_SIZE = 20
+
+def load_markup_layer(inspection_id):
+    response = requests.get(f"http://localhost:8000/inspections/{inspection_id}/layers")
+    layer = next((l for l in response.json() if l["name"] == MARKUP_LAYER), None)
+    st.session_state["shapes"] = layer["shapes"] if layer else []
+    st.session_state["layer_version"] = layer["version"] if layer else 0
+
+def send_markup_delta(**delta):
+    # Runs as a button callback, before the rerun, so the preview below is already up to date
+    inspection_id = st.session_state["inspection_id"]
+    st.session_state.pop("export_bytes", None)
+    response = requests.patch(
+        f"http://localhost:8000/inspections/{inspection_id}/layers/{MARKUP_LAYER}",
+        json={"base_version": st.session_state["layer_version"], **delta}
+    )
+    if response.status_code == 409:
+        load_markup_layer(inspection_id)
+        st.warning("Markup was changed elsewhere; reloaded the latest version, please try again.")
+    elif response.ok:
+        layer = response.json()
+        st.session_state["shapes"] = layer["shapes"]
+        st.session_state["layer_version"] = layer["version"]
+    else:
+        st.error(f"Failed to save markup: {response.json().get('detail')}")
+
+def preview_markup(base_img, shapes):
+    # Display only: drawn on a fresh copy each rerun, never saved or re-encoded
+    img = base_img.copy()
+    draw = ImageDraw.Draw(img)
+    scale = max(img.width, img.height) / REFERENCE_SIDE
+    font = ImageFont.load_default(size=max(8, round(TEXT_SIZE * scale)))
+    for shape in shapes:
+        points = [(x * img.width, y * img.height) for x, y in shape["points"]]
+        rgb = tuple(int(shape["color"][i:i+2], 16) for i in (1, 3, 5))
+        line_width = max(1, round(shape["width"] * scale))
+        if shape["type"] == "box":
+            (x1, y1), (x2, y2) = points
+            draw.rectangle([min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2)], outline=rgb, width=line_width)
+        elif shape["type"] == "polygon":
+            draw.line(points + points[:1], fill=rgb, width=line_width, joint="curve")
+        if shape.get("note"):
+            x, y = points[0]
+            offset = 0 if shape["type"] == "text" else font.size + line_width
+            draw.text((x, max(0, y - offset)), shape["note"], fill=rgb, font=font)
+    return img
+
 with tab2:
     st.subheader("Manual Image Markup & Editing")
 
@@ -146,14 +200,15 @@ with tab2:
             annotated_url = latest["annotated_path"]
             img_response = requests.get(f"http://localhost:8000{annotated_url}")
             img_data = img_response.content
-            img = Image.open(BytesIO(img_data)).convert("RGB")
-            st.session_state["draw_img"] = img.copy()
-            st.session_state["annotations"] = []
+            st.session_state["base_img"] = Image.open(BytesIO(img_data)).convert("RGB")
+            st.session_state["inspection_id"] = latest["id"]
+            st.session_state.pop("export_bytes", None)
+            load_markup_layer(latest["id"])
         except Exception as e:
             st.error(f"Failed to load image: {e}")
 
-    if "draw_img" in st.session_state:
-        draw_img = st.session_state["draw_img"]
+    if "base_img" in st.session_state:
+        base_img = st.session_state["base_img"]
 
         color = st.color_picker("Line color", "#FF0000")
         stroke_width = st.slider("Line thickness", 1, 10, 3)
@@ -161,35 +216,46 @@ with tab2:
 
         col1, col2 = st.columns([2, 1])
         with col1:
-            st.image(draw_img, caption="Marked-up Image", use_column_width=True)
+            st.image(preview_markup(base_img, st.session_state["shapes"]), caption="Marked-up Image", use_column_width=True)
         with col2:
-            x1 = st.number_input("X1", 0, draw_img.width, 50)
-            y1 = st.number_input("Y1", 0, draw_img.height, 50)
-            x2 = st.number_input("X2", 0, draw_img.width, 150)
-            y2 = st.number_input("Y2", 0, draw_img.height, 150)
-
-        if st.button("Add Box"):
-            draw = ImageDraw.Draw(draw_img)
-            rgb = tuple(int(color[i:i+2], 16) for i in (1, 3, 5))
-            draw.rectangle([x1, y1, x2, y2], outline=rgb, width=stroke_width)
-            if annotation_text:
-                try:
-                    font = ImageFont.truetype("arial.ttf", 20)
-                except:
-                    font = ImageFont.load_default()
-                draw.text((x1, y1-25), annotation_text, fill=rgb, font=font)
-            st.session_state["draw_img"] = draw_img
-
-        buf = BytesIO()
-        draw_img.save(buf, format="JPEG")
-        byte_img = buf.getvalue()
-
-        st.download_button(
-            label="💾 Save Marked-up Image",
-            data=byte_img,
-            file_name=f"marked_{uuid.uuid4()}.jpg",
-            mime="image/jpeg"
-        )
+            x1 = st.number_input("X1", 0, base_img.width, 50)
+            y1 = st.number_input("Y1", 0, base_img.height, 50)
+            x2 = st.number_input("X2", 0, base_img.width, 150)
+            y2 = st.number_input("Y2", 0, base_img.height, 150)
+
+        # Coordinates are sent as fractions of the image, so they apply at any resolution
+        shape = {
+            "id": uuid.uuid4().hex[:12],
+            "type": "box",
+            "points": [[x1 / base_img.width, y1 / base_img.height], [x2 / base_img.width, y2 / base_img.height]],
+            "color": color.upper(),
+            "width": stroke_width,
+            "note": annotation_text or None
+        }
+        st.button("Add Box", on_click=send_markup_delta, kwargs={"add": [shape]})
+
+        shapes = st.session_state["shapes"]
+        if shapes:
+            labels = {s["id"]: f"{i + 1}. {s.get('note') or s['type'].title()}" for i, s in enumerate(shapes)}
+            selected = st.selectbox("Markup", list(labels), format_func=labels.get)
+            st.button("Remove Selected", on_click=send_markup_delta, kwargs={"remove": [selected]})
+
+        if st.button("🖼️ Export Marked-up Image"):
+            inspection_id = st.session_state["inspection_id"]
+            response = requests.get(f"http://localhost:8000/inspections/{inspection_id}/export",
+                                    params={"base": "annotated", "layers": MARKUP_LAYER})
+            if response.status_code == 200:
+                st.session_state["export_bytes"] = response.content
+            else:
+                st.error("Export failed.")
+
+        if "export_bytes" in st.session_state:
+            st.download_button(
+                label="💾 Save Marked-up Image",
+                data=st.session_state["export_bytes"],
+                file_name=f"marked_{st.session_state['inspection_id']}.jpg",
+                mime="image/jpeg"
+            )
 
 # --- TAB 3: View Data ---
 with tab3:
@@ -0,0 +1,150 @@
+# app/annotations.py
+#
+# Manual markup is stored as vector layers (database.AnnotationLayer), not as
+# edited pixels. Each layer is a list of shapes with coordinates as fractions
+# of the image, edited by deltas (add / update / remove by shape id) against
+# the layer's version. Pixels are only produced on export: the shapes are drawn
+# once onto the untouched upload (or the AI-annotated image) and the result is
+# cached on disk under a key made of the layer versions, so repeated exports
+# are a file read and edits never degrade the image.
+#
+#   {"id": "b1", "type": "box", "points": [[x1, y1], [x2, y2]], "color": "#FF0000", "width": 3, "note": "..."}
+#   {"id": "p1", "type": "polygon", "points": [[x, y], ...], ...}
+#   {"id": "t1", "type": "text", "points": [[x, y]], "note": "Weld seam"}
+#
+# width (and text size) are in pixels at REFERENCE_SIDE on the image's long
+# side, so markup looks the same whatever the export resolution.
+
+import hashlib
+import json
+import os
+from datetime import datetime
+
+from PIL import ImageDraw, ImageFont
+
+import app.database as database
+import app.imaging as imaging
+
+EXPORT_DIR = os.getenv("EXPORT_DIR", "exports")
+REFERENCE_SIDE = 1000
+TEXT_SIZE = 20
+BASES = ("original", "annotated")
+FORMATS = {"jpeg": ("JPEG", "jpg", "image/jpeg"), "png": ("PNG", "png", "image/png")}
+
+
+class LayerConflict(Exception):
+    pass
+
+
+def apply_delta(shapes, add=(), update=(), remove=()):
+    """New shape list with a delta applied; raises ValueError for ids that do not fit."""
+    by_id = {shape["id"]: shape for shape in shapes}
+    for shape_id in remove:
+        if by_id.pop(shape_id, None) is None:
+            raise ValueError(f"No shape with id {shape_id!r}")
+    for shape in update:
+        if shape["id"] not in by_id:
+            raise ValueError(f"No shape with id {shape['id']!r}")
+        by_id[shape["id"]] = shape
+    for shape in add:
+        if shape["id"] in by_id:
+            raise ValueError(f"Shape id {shape['id']!r} already exists")
+        by_id[shape["id"]] = shape
+    # dicts keep insertion order, so shapes are drawn in the order they were added
+    return list(by_id.values())
+
+
+def update_layer(db, inspection_id, name, base_version, add=(), update=(), remove=()):
+    """Apply a delta to a layer (created on first use); the caller commits.
+
+    Raises LayerConflict if the layer has moved past base_version, so an editor
+    working from a stale copy reloads instead of overwriting someone else's work.
+    """
+    AnnotationLayer = database.AnnotationLayer
+    layer = db.query(AnnotationLayer).filter(
+        AnnotationLayer.inspection_id == inspection_id, AnnotationLayer.name == name
+    ).first()
+    current = layer.version if layer is not None else 0
+    if base_version != current:
+        raise LayerConflict(f"Layer {name!r} is at version {current}, not {base_version}")
+
+    shapes = apply_delta(layer.shapes if layer is not None else [], add, update, remove)
+    now = datetime.utcnow()
+    if layer is None:
+        layer = AnnotationLayer(inspection_id=inspection_id, name=name, version=1, shapes=shapes,
+                                created_at=now, updated_at=now)
+        db.add(layer)
+        return layer
+
+    # Compare-and-set on the version, in case another request committed in between
+    updated = db.query(AnnotationLayer).filter(
+        AnnotationLayer.id == layer.id, AnnotationLayer.version == base_version
+    ).update({"version": base_version + 1, "shapes": shapes, "updated_at": now}, synchronize_session=False)
+    if not updated:
+        raise LayerConflict(f"Layer {name!r} was changed by another request")
+    return layer
+
+
+def cache_key(inspection_id, base, layers, fmt):
+    versions = sorted((layer.name, layer.version) for layer in layers)
+    digest = hashlib.sha1(json.dumps([base, versions]).encode()).hexdigest()[:16]
+    return f"{inspection_id}_{base}_{digest}.{FORMATS[fmt][1]}"
+
+
+def _rgb(color):
+    return tuple(int(color[i:i + 2], 16) for i in (1, 3, 5))
+
+
+def render(image, layers):
+    """Draw the layers' shapes onto a copy of image."""
+    image = image.copy()
+    draw = ImageDraw.Draw(image)
+    width, height = image.size
+    scale = max(width, height) / REFERENCE_SIDE
+    font = ImageFont.load_default(size=max(8, round(TEXT_SIZE * scale)))
+
+    for layer in layers:
+        for shape in layer.shapes:
+            points = [(x * width, y * height) for x, y in shape["points"]]
+            color = _rgb(shape.get("color", "#FF0000"))
+            line_width = max(1, round(shape.get("width", 3) * scale))
+            if shape["type"] == "box":
+                (x1, y1), (x2, y2) = points
+                draw.rectangle([min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2)], outline=color, width=line_width)
+            elif shape["type"] == "polygon":
+                draw.line(points + points[:1], fill=color, width=line_width, joint="curve")
+            if shape.get("note"):
+                x, y = points[0]
+                # Notes sit just above a shape's first point, or at a text shape's anchor
+                offset = 0 if shape["type"] == "text" else font.size + line_width
+                draw.text((x, max(0, y - offset)), shape["note"], fill=color, font=font)
+    return image
+
+
+def export(inspection, base, layers, fmt):
+    """Path of the composited image, rendering it only if this combination of versions is not cached."""
+    path = os.path.join(EXPORT_DIR, cache_key(inspection.id, base, layers, fmt))
+    if os.path.exists(path):
+        return path
+
+    url = inspection.image_path if base == "original" else inspection.annotated_path
+    if not url:
+        raise FileNotFoundError(f"Inspection {inspection.id} has no {base} image")
+    source = os.path.join("uploads" if base == "original" else "annotated", url.split("/")[-1])
+    with open(source, "rb") as f:
+        image = imaging.decode_image(f, full_resolution=True)
+    composite = render(image, layers)
+
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    # Older versions of this export will not be asked for again
+    prefix = f"{inspection.id}_{base}_"
+    for name in os.listdir(EXPORT_DIR):
+        if name.startswith(prefix) and name.endswith("." + FORMATS[fmt][1]):
+            try:
+                os.remove(os.path.join(EXPORT_DIR, name))
+            except FileNotFoundError:
+                pass
+    tmp_path = path + ".tmp"
+    composite.save(tmp_path, FORMATS[fmt][0], **({"quality": 95} if fmt == "jpeg" else {}))
+    os.replace(tmp_path, path)
+    return path
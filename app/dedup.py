@@ -0,0 +1,155 @@
+# app/dedup.py
+
+from PIL import Image
+from sqlalchemy import or_
+from itertools import combinations
+import os
+
+import app.database as database
+
+# 64-bit dHash split into 4 x 16-bit bands for multi-index hashing: if two hashes
+# are within radius r, at least one band differs by no more than r // 4 bits.
+HASH_BITS = 64
+BANDS = 4
+BAND_BITS = HASH_BITS // BANDS
+BAND_MASK = (1 << BAND_BITS) - 1
+MAX_RADIUS = 11  # r // 4 <= 2 keeps the candidate set per band at 137 values
+DUPLICATE_RADIUS = int(os.getenv("DUPLICATE_RADIUS", 4))
+# Flat or low-texture images hash to (nearly) all zeros or all ones whatever
+# they show, so those hashes are never matched
+DEGENERATE_BITS = 4
+# Largest per-channel difference in mean colour for a duplicate's result to be reused
+COLOR_TOLERANCE = int(os.getenv("DUPLICATE_COLOR_TOLERANCE", 24))
+
+
+def dhash(image: Image.Image) -> int:
+    # Difference hash: compare horizontally adjacent pixels of a 9x8 thumbnail
+    small = image.convert("L").resize((9, 8), Image.Resampling.BILINEAR)
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+def mean_color(image: Image.Image) -> str:
+    r, g, b = image.convert("RGB").resize((1, 1), Image.Resampling.BOX).getpixel((0, 0))
+    return f"{r:02x}{g:02x}{b:02x}"
+
+
+def colors_match(a, b, tolerance=COLOR_TOLERANCE) -> bool:
+    if a is None or b is None:
+        return False
+    return all(abs(int(a[i:i + 2], 16) - int(b[i:i + 2], 16)) <= tolerance for i in (0, 2, 4))
+
+
+def is_degenerate(value: int) -> bool:
+    bits = bin(value).count("1")
+    return bits <= DEGENERATE_BITS or bits >= HASH_BITS - DEGENERATE_BITS
+
+
+def to_hex(value: int) -> str:
+    return f"{value:016x}"
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def bands(value: int) -> list:
+    return [(value >> (i * BAND_BITS)) & BAND_MASK for i in range(BANDS)]
+
+
+def band_neighbours(band: int, distance: int) -> list:
+    # Every band value within `distance` bits of `band`, including itself
+    values = [band]
+    for d in range(1, distance + 1):
+        for bits in combinations(range(BAND_BITS), d):
+            flipped = band
+            for bit in bits:
+                flipped ^= 1 << bit
+            values.append(flipped)
+    return values
+
+
+def hash_columns(value: int, color=None) -> dict:
+    """Column values to store on an Inspection for a given hash (and mean colour)."""
+    b0, b1, b2, b3 = bands(value)
+    columns = {"image_hash": to_hex(value), "hash_b0": b0, "hash_b1": b1, "hash_b2": b2, "hash_b3": b3}
+    if color is not None:
+        columns["mean_color"] = color
+    return columns
+
+
+def find_near_duplicates(db, value: int, radius=DUPLICATE_RADIUS, project_id=None, limit=10):
+    """Return [(inspection, distance)] within `radius` bits, closest first.
+
+    Each band column is indexed, so the database only returns rows that share a
+    near-identical band; exact distances are checked here. A degenerate hash
+    matches nothing.
+    """
+    if is_degenerate(value):
+        return []
+    radius = min(radius, MAX_RADIUS)
+    Inspection = database.Inspection
+    band_columns = [Inspection.hash_b0, Inspection.hash_b1, Inspection.hash_b2, Inspection.hash_b3]
+    per_band = radius // BANDS
+
+    conditions = [column.in_(band_neighbours(band, per_band)) for column, band in zip(band_columns, bands(value))]
+    query = db.query(Inspection).filter(or_(*conditions))
+    if project_id is not None:
+        query = query.filter(Inspection.project_id == project_id)
+
+    matches = []
+    for inspection in query:
+        distance = hamming(value, int(inspection.image_hash, 16))
+        if distance <= radius:
+            matches.append((inspection, distance))
+    matches.sort(key=lambda m: (m[1], m[0].id))
+    return matches[:limit]
+
+
+def group_duplicates(db, project_id, radius=DUPLICATE_RADIUS):
+    """Cluster a project's inspections into groups of near-duplicate shots.
+
+    Buckets every hash by band in memory (O(project size)) and unions pairs
+    within `radius`, so shots chained by small steps end up in one group.
+    """
+    radius = min(radius, MAX_RADIUS)
+    per_band = radius // BANDS
+    Inspection = database.Inspection
+    rows = db.query(Inspection.id, Inspection.image_hash).filter(
+        Inspection.project_id == project_id,
+        Inspection.image_hash.isnot(None)
+    ).order_by(Inspection.id).all()
+
+    hashes = {inspection_id: int(h, 16) for inspection_id, h in rows if not is_degenerate(int(h, 16))}
+    buckets = [{} for _ in range(BANDS)]
+    for inspection_id, value in hashes.items():
+        for i, band in enumerate(bands(value)):
+            buckets[i].setdefault(band, []).append(inspection_id)
+
+    parent = {inspection_id: inspection_id for inspection_id in hashes}
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for inspection_id, value in hashes.items():
+        for i, band in enumerate(bands(value)):
+            for neighbour_band in band_neighbours(band, per_band):
+                for other in buckets[i].get(neighbour_band, ()):
+                    if other <= inspection_id or find(other) == find(inspection_id):
+                        continue
+                    if hamming(value, hashes[other]) <= radius:
+                        parent[find(other)] = find(inspection_id)
+
+    groups = {}
+    for inspection_id in hashes:
+        groups.setdefault(find(inspection_id), []).append(inspection_id)
+    return [ids for ids in groups.values() if len(ids) > 1]
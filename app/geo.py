@@ -0,0 +1,111 @@
+# app/geo.py
+
+import math
+
+from sqlalchemy import and_, or_
+
+import app.database as database
+
+# Geohash gives a spatial index that works the same on SQLite and Postgres: a
+# plain B-tree on the string column answers "all cells under this prefix" as a
+# range scan, so a bounding box becomes a handful of index range lookups.
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+GEOHASH_PRECISION = 9  # ~4.8m x 4.8m cells
+MAX_COVER_CELLS = 16
+EARTH_RADIUS_M = 6371008.8
+
+
+def geohash_encode(lat, lon, precision=GEOHASH_PRECISION):
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits, bit_count, even = 0, 0, True
+    while len(chars) < precision:
+        rng, value = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits <<= 1
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(BASE32[bits])
+            bits, bit_count = 0, 0
+    return "".join(chars)
+
+
+def cell_size(precision):
+    """(lat_degrees, lon_degrees) covered by one geohash cell."""
+    lon_bits = math.ceil(5 * precision / 2)
+    lat_bits = 5 * precision - lon_bits
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def covering_cells(min_lat, min_lon, max_lat, max_lon):
+    """Geohash prefixes that together cover the box, at most MAX_COVER_CELLS of them."""
+    precision = GEOHASH_PRECISION
+    while precision > 1:
+        lat_step, lon_step = cell_size(precision)
+        count = (math.floor((max_lat - min_lat) / lat_step) + 2) * (math.floor((max_lon - min_lon) / lon_step) + 2)
+        if count <= MAX_COVER_CELLS:
+            break
+        precision -= 1
+
+    lat_step, lon_step = cell_size(precision)
+    cells = set()
+    lat = min_lat
+    while True:
+        lon = min_lon
+        while True:
+            cells.add(geohash_encode(lat, lon, precision))
+            if lon >= max_lon:
+                break
+            lon = min(lon + lon_step, max_lon)
+        if lat >= max_lat:
+            break
+        lat = min(lat + lat_step, max_lat)
+    return sorted(cells)
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def bbox_around(lat, lon, radius_m):
+    dlat = math.degrees(radius_m / EARTH_RADIUS_M)
+    # Longitude degrees shrink towards the poles; clamp to avoid dividing by ~0
+    dlon = math.degrees(radius_m / (EARTH_RADIUS_M * max(math.cos(math.radians(lat)), 1e-6)))
+    return max(lat - dlat, -90.0), max(lon - dlon, -180.0), min(lat + dlat, 90.0), min(lon + dlon, 180.0)
+
+
+def query_bbox(db, min_lat, min_lon, max_lat, max_lon, prediction=None):
+    Inspection = database.Inspection
+    # '~' sorts after every base32 character, so [prefix, prefix~) is the whole cell
+    prefixes = [and_(Inspection.geohash >= cell, Inspection.geohash < cell + "~")
+                for cell in covering_cells(min_lat, min_lon, max_lat, max_lon)]
+    query = db.query(Inspection).filter(
+        or_(*prefixes),
+        Inspection.latitude.between(min_lat, max_lat),
+        Inspection.longitude.between(min_lon, max_lon)
+    )
+    if prediction is not None:
+        query = query.filter(Inspection.prediction == prediction)
+    return query
+
+
+def query_radius(db, lat, lon, radius_m, prediction=None, limit=100):
+    """Inspections within radius_m of (lat, lon) as [(inspection, distance_m)], nearest first."""
+    matches = []
+    for inspection in query_bbox(db, *bbox_around(lat, lon, radius_m), prediction=prediction):
+        distance = haversine_m(lat, lon, inspection.latitude, inspection.longitude)
+        if distance <= radius_m:
+            matches.append((inspection, distance))
+    matches.sort(key=lambda m: m[1])
+    return matches[:limit]
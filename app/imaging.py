@@ -0,0 +1,96 @@
+# app/imaging.py
+
+from PIL import Image, ImageOps
+from datetime import datetime
+import os
+
+# The model letterboxes everything to 640px, so there is no point decoding more
+INFERENCE_SIZE = 640
+FAST_DECODE = os.getenv("FAST_DECODE", "1") != "0"
+
+
+class ImageTooLarge(ValueError):
+    pass
+
+
+def decode_image(fp, max_side=INFERENCE_SIZE, full_resolution=False, max_pixels=None):
+    """Decode an upload to an upright RGB image.
+
+    JPEGs are decoded with libjpeg's DCT-domain scaling (1/2, 1/4 or 1/8) to the
+    smallest size whose long side is still >= max_side, so a 24 MP photo never
+    materialises at full size. Other formats are decoded in full and then
+    reduced by an integer factor to the same bound. Pass full_resolution=True when every pixel is
+    needed (tiled inference, archival re-encodes).
+
+    Image.open() only parses the header, so max_pixels is enforced before any
+    pixel data is decoded.
+    """
+    image = Image.open(fp)
+    if max_pixels is not None and image.size[0] * image.size[1] > max_pixels:
+        raise ImageTooLarge(f"Image is {image.size[0]}x{image.size[1]}, limit is {max_pixels} pixels")
+
+    if FAST_DECODE and not full_resolution and image.format == "JPEG":
+        width, height = image.size
+        scale = max_side / max(width, height)
+        if scale < 1:
+            # draft() only ever picks a size >= the one requested, in both dimensions
+            image.draft("RGB", (int(width * scale), int(height * scale)))
+
+    # Phone and drone cameras store rotation in EXIF rather than in the pixels
+    image = ImageOps.exif_transpose(image).convert("RGB")
+    if not full_resolution:
+        # Only JPEGs can be scaled while decoding; PNG, WebP and the like are
+        # brought down afterwards, so the caller never keeps a full-size image
+        factor = max(image.size) // max_side
+        if factor > 1:
+            image = image.reduce(factor)
+    return image
+
+
+EXIF_IFD = 0x8769
+GPS_IFD = 0x8825
+
+
+def _gps_degrees(dms, ref):
+    degrees = float(dms[0]) + float(dms[1]) / 60 + float(dms[2]) / 3600
+    return -degrees if ref in ("S", "W") else degrees
+
+
+def read_exif(image: Image.Image) -> dict:
+    """Pull capture time, camera and GPS position out of an image's EXIF.
+
+    Works on the decoded image too: exif_transpose() and convert() carry the
+    raw EXIF block along in image.info. Missing or malformed tags are skipped.
+    """
+    exif = image.getexif()
+    meta = {}
+
+    make, model = exif.get(271), exif.get(272)
+    if make:
+        meta["camera_make"] = str(make).strip("\x00 ")
+    if model:
+        meta["camera_model"] = str(model).strip("\x00 ")
+
+    taken = exif.get_ifd(EXIF_IFD).get(36867) or exif.get(306)  # DateTimeOriginal, DateTime
+    if taken:
+        try:
+            meta["captured_at"] = datetime.strptime(str(taken).strip("\x00 "), "%Y:%m:%d %H:%M:%S")
+        except ValueError:
+            pass
+
+    gps = exif.get_ifd(GPS_IFD)
+    try:
+        if 2 in gps and 4 in gps:
+            meta["latitude"] = _gps_degrees(gps[2], gps.get(1, "N"))
+            meta["longitude"] = _gps_degrees(gps[4], gps.get(3, "E"))
+            if 6 in gps:
+                altitude = float(gps[6])
+                meta["altitude"] = -altitude if gps.get(5) in (1, b"\x01") else altitude
+    except (TypeError, ValueError, ZeroDivisionError, IndexError):
+        meta.pop("latitude", None)
+        meta.pop("longitude", None)
+
+    if not (-90 <= meta.get("latitude", 0) <= 90 and -180 <= meta.get("longitude", 0) <= 180):
+        meta.pop("latitude")
+        meta.pop("longitude")
+    return meta
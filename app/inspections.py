@@ -0,0 +1,85 @@
+# app/inspections.py
+#
+# Turning a model result into a stored Inspection, shared by /upload, saved
+# live findings and video segments so every source records the same fields:
+# archived original, annotated image, hashes, EXIF, duplicate link, rollups.
+
+import os
+import shutil
+from datetime import datetime
+
+from PIL import Image
+
+import app.database as database
+import app.dedup as dedup
+import app.geo as geo
+import app.imaging as imaging
+import app.rollups as rollups
+
+
+def describe(db, image, project_id):
+    """EXIF, hash, mean colour and closest near-duplicate of a decoded image."""
+    exif = imaging.read_exif(image)
+    if "latitude" in exif:
+        exif["geohash"] = geo.geohash_encode(exif["latitude"], exif["longitude"])
+    image_hash = dedup.dhash(image)
+    matches = dedup.find_near_duplicates(db, image_hash, project_id=project_id, limit=1)
+    return {
+        "exif": exif,
+        "image_hash": image_hash,
+        "image_color": dedup.mean_color(image),
+        "duplicate": matches[0][0] if matches else None
+    }
+
+
+def write_original(path, original):
+    # Uploads are archived byte-for-byte; only video frames exist solely as pixels
+    if isinstance(original, Image.Image):
+        original.save(path, "JPEG", quality=95)
+    elif isinstance(original, bytes):
+        with open(path, "wb") as out:
+            out.write(original)
+    else:
+        original.seek(0)
+        with open(path, "wb") as out:
+            shutil.copyfileobj(original, out)
+
+
+def build_inspection(db, results, info, filename, original, image_metadata, project_id="default",
+                     project_description=None, **fields):
+    """Save the images, then add the Inspection and its rollups to db; the caller commits.
+
+    original is the upload as bytes or a file object, or a PIL image for video
+    frames. A result reused from a near-duplicate has no annotated_image and
+    points at the duplicate's instead.
+    """
+    write_original(os.path.join("uploads", filename), original)
+    duplicate = info["duplicate"]
+    if "annotated_image" in results:
+        annotated_filename = f"annotated_{filename}"
+        results["annotated_image"].convert("RGB").save(os.path.join("annotated", annotated_filename), "JPEG", quality=95)
+        annotated_url = f"/annotated/{annotated_filename}"
+    else:
+        annotated_url = duplicate.annotated_path
+
+    inspection = database.Inspection(
+        image_path=f"/images/{filename}",
+        annotated_path=annotated_url,
+        prediction=results["label"],
+        confidence=results["confidence"],
+        model_version=results.get("model_version"),
+        detections=results.get("detections"),
+        corrosion_coverage=results.get("coverage"),
+        mask_rle=results.get("mask_rle"),
+        image_metadata=image_metadata,
+        project_id=project_id,
+        project_description=project_description,
+        duplicate_of=duplicate.id if duplicate is not None else None,
+        uploaded_at=datetime.utcnow(),
+        **dedup.hash_columns(info["image_hash"], info["image_color"]),
+        **info["exif"],
+        **fields
+    )
+    db.add(inspection)
+    rollups.record_inspection(db, inspection)
+    return inspection
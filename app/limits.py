@@ -0,0 +1,103 @@
+# app/limits.py
+
+import json
+import os
+
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", 25 * 1024 * 1024))
+MAX_IMAGE_PIXELS = int(os.getenv("MAX_IMAGE_PIXELS", 60_000_000))
+# Uploads allowed past admission at once: one running inference, the rest queued
+# behind it, each holding its spooled body plus an image decoded to at most
+# 2x INFERENCE_SIZE on the long side (a few MB); only the decode itself briefly
+# needs the full MAX_IMAGE_PIXELS
+MAX_INFLIGHT_UPLOADS = int(os.getenv("MAX_INFLIGHT_UPLOADS", 4))
+RETRY_AFTER_SECONDS = int(os.getenv("RETRY_AFTER_SECONDS", 2))
+# Videos are only spooled to disk by the request itself; ingestion runs as a background job
+MAX_VIDEO_BYTES = int(os.getenv("MAX_VIDEO_BYTES", 2 * 1024 * 1024 * 1024))
+
+
+class BodyTooLarge(Exception):
+    pass
+
+
+async def send_json(send, status, detail, headers=()):
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            *headers
+        ]
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class UploadLimitMiddleware:
+    """ASGI middleware guarding the upload endpoints.
+
+    Requests are turned away before their body is read: 503 + Retry-After when
+    max_inflight (MAX_INFLIGHT_UPLOADS) are already being processed, 413 when
+    Content-Length is over max_bytes (MAX_UPLOAD_BYTES). Bodies without a
+    usable Content-Length are counted as they stream in and cut off at the
+    same limit.
+    """
+
+    def __init__(self, app, paths=("/upload",), max_bytes=None, max_inflight=None):
+        self.app = app
+        self.paths = set(paths)
+        self.max_bytes = max_bytes or MAX_UPLOAD_BYTES
+        self.max_inflight = max_inflight or MAX_INFLIGHT_UPLOADS
+        self.inflight = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_bytes:
+            await send_json(send, 413, f"Upload exceeds {self.max_bytes} bytes")
+            return
+
+        # Everything runs on the event loop thread, so a plain counter is safe
+        if self.inflight >= self.max_inflight:
+            await send_json(send, 503, "Inference queue is full, retry later",
+                            [(b"retry-after", str(RETRY_AFTER_SECONDS).encode())])
+            return
+
+        received = 0
+        too_large = False
+        started = False
+
+        async def limited_receive():
+            nonlocal received, too_large
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    too_large = True
+                    raise BodyTooLarge()
+            return message
+
+        async def guarded_send(message):
+            nonlocal started
+            if too_large:
+                # The framework turns the aborted body parse into a generic 400; drop it
+                return
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        self.inflight += 1
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            if not too_large:
+                raise
+        finally:
+            self.inflight -= 1
+
+        if too_large and not started:
+            await send_json(send, 413, f"Upload exceeds {self.max_bytes} bytes")
@@ -0,0 +1,79 @@
+# app/live.py
+#
+# Live camera inspection over a WebSocket (/ws/live). Frames are decoded and
+# run through the model without touching the disk or the database; only
+# frames the client marks as findings are stored as inspections.
+#
+#   client -> server   binary  4-byte big-endian frame id + JPEG bytes
+#                      text    {"type": "finding", "id": <frame id>}
+#   server -> client   {"id", "label", "conf", "cov", "boxes", "ms", "dropped"}
+#                      {"type": "saved", "id", "inspection_id"}
+#                      {"type": "error", "id", "detail"}
+#
+# boxes are [x1, y1, x2, y2, conf] with coordinates as fractions of the frame
+# (as stored in Inspection.detections), so they do not depend on the size the
+# frame was decoded at. If frames arrive faster than the model can take them,
+# the one waiting is replaced by the newest (latest frame wins) and counted in
+# "dropped".
+
+import asyncio
+import json
+import os
+import struct
+
+LIVE_MAX_SESSIONS = int(os.getenv("LIVE_MAX_SESSIONS", 4))
+LIVE_MAX_FRAME_BYTES = int(os.getenv("LIVE_MAX_FRAME_BYTES", 2 * 1024 * 1024))
+# Recent frames kept per session so a finding can be marked after its result arrives
+LIVE_RECENT_FRAMES = int(os.getenv("LIVE_RECENT_FRAMES", 30))
+
+HEADER = struct.Struct(">I")
+
+
+def pack_frame(frame_id, data):
+    return HEADER.pack(frame_id) + data
+
+
+def unpack_frame(message):
+    if len(message) <= HEADER.size:
+        raise ValueError("Frame message is too short")
+    return HEADER.unpack_from(message)[0], message[HEADER.size:]
+
+
+class LatestFrame:
+    """Single-slot mailbox: put() replaces whatever has not been taken yet."""
+
+    def __init__(self):
+        self.item = None
+        self.dropped = 0
+        self.closed = False
+        self._ready = asyncio.Event()
+
+    def put(self, item):
+        if self.item is not None:
+            self.dropped += 1
+        self.item = item
+        self._ready.set()
+
+    def close(self):
+        self.closed = True
+        self._ready.set()
+
+    async def get(self):
+        """The newest frame, waiting for one if needed; None once closed."""
+        while self.item is None and not self.closed:
+            self._ready.clear()
+            await self._ready.wait()
+        item, self.item = self.item, None
+        return item
+
+
+def compact(frame_id, result, timings, dropped):
+    return json.dumps({
+        "id": frame_id,
+        "label": result["label"],
+        "conf": round(result["confidence"], 3),
+        "cov": round(result["coverage"], 4) if result.get("coverage") is not None else None,
+        "boxes": [[*(round(v, 4) for v in d["box"]), round(d["confidence"], 3)] for d in result["detections"]],
+        "ms": {name: round(ms, 1) for name, ms in timings.items()},
+        "dropped": dropped
+    }, separators=(",", ":"))
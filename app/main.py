@@ -1,18 +1,27 @@
 # app/main.py
 
-from fastapi import FastAPI, UploadFile, File, Depends, HTTPException, Form
+import time
+_import_started = time.perf_counter()
+
+from fastapi import FastAPI, UploadFile, File, Depends, HTTPException, Form, Request, WebSocket, WebSocketDisconnect, Path
 from fastapi.staticfiles import StaticFiles
 from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
 from PIL import Image
 import os
+import shutil
 import asyncio
 from uuid import uuid4
-from datetime import datetime
+from datetime import date, datetime
 import logging
 from concurrent.futures import ThreadPoolExecutor
 import io
-import pandas as pd
-from fastapi.responses import StreamingResponse
+import threading
+import json
+from collections import deque
+from contextlib import asynccontextmanager
+from fastapi.responses import StreamingResponse, FileResponse, PlainTextResponse, JSONResponse
+import secrets
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -21,97 +30,458 @@ logger = logging.getLogger(__name__)
 # Create required directories
 os.makedirs("uploads", exist_ok=True)
 os.makedirs("annotated", exist_ok=True)
+os.makedirs("videos", exist_ok=True)
 
 # Create thread pool
-thread_pool = ThreadPoolExecutor(max_workers=1)
+thread_pool = ThreadPoolExecutor(max_workers=int(os.getenv("INFERENCE_WORKERS", 1)))
+# Video jobs run one at a time; each feeds its batches through thread_pool, so
+# photo uploads still get a turn between batches
+video_pool = ThreadPoolExecutor(max_workers=1)
+# Live frames get their own worker, and detect() its own model instance, so they
+# never queue behind uploads or video batches
+live_pool = ThreadPoolExecutor(max_workers=int(os.getenv("LIVE_WORKERS", 1)))
 
 # Import local modules
 import app.database as database
 import app.schemas as schemas
 import app.model as model
+import app.imaging as imaging
+import app.limits as limits
+import app.dedup as dedup
+import app.geo as geo
+import app.rollups as rollups
+import app.profiling as profiling
+import app.registry as registry
+import app.video as video
+import app.live as live
+import app.annotations as annotations
+import app.inspections as inspections
+
+# Admin-only endpoints and headers are disabled unless a token is configured
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+# Load the model in the background at startup instead of on the first upload
+WARM_MODEL = os.getenv("WARM_MODEL", "1") != "0"
+DB_INIT_TIMEOUT = float(os.getenv("DB_INIT_TIMEOUT", 30))
+VIDEO_JOBS_KEEP = int(os.getenv("VIDEO_JOBS_KEEP", 100))
+
+# Nothing heavy (torch, ultralytics, cv2, pandas) is imported or connected at
+# import time; the database and model are initialised on background threads
+# once the server is up, so health checks answer immediately after a wake-up
+startup_report = {
+    "import_ms": None,
+    "init_ms": {},
+    "errors": {}
+}
+db_ready = threading.Event()
+model_ready = threading.Event()
+
+def init_database():
+    start = time.perf_counter()
+    try:
+        database.Base.metadata.create_all(bind=database.engine)
+        database.add_missing_columns()
+    except Exception as e:
+        logger.exception("Database initialisation failed")
+        startup_report["errors"]["database"] = str(e)
+    finally:
+        startup_report["init_ms"]["database"] = (time.perf_counter() - start) * 1000
+        db_ready.set()
+
+def warm_model():
+    start = time.perf_counter()
+    try:
+        model.load_model()
+    except Exception as e:
+        logger.exception("Model warm-up failed")
+        startup_report["errors"]["model"] = str(e)
+    finally:
+        startup_report["init_ms"]["model"] = (time.perf_counter() - start) * 1000
+        model_ready.set()
+
+@asynccontextmanager
+async def lifespan(app):
+    threading.Thread(target=init_database, name="db-init", daemon=True).start()
+    if WARM_MODEL and not model.STUB_MODEL:
+        # Queued on the inference executor, so early uploads simply wait behind it
+        thread_pool.submit(warm_model)
+    else:
+        model_ready.set()
+    yield
 
 # Create FastAPI app
-app = FastAPI(title="Corrosion Detection API")
+app = FastAPI(title="Corrosion Detection API", lifespan=lifespan)
+app.add_middleware(limits.UploadLimitMiddleware, paths=["/upload"])
+app.add_middleware(limits.UploadLimitMiddleware, paths=["/videos"], max_bytes=limits.MAX_VIDEO_BYTES)
 
 # Serve uploaded and annotated images
 app.mount("/images", StaticFiles(directory="uploads"), name="images")
 app.mount("/annotated", StaticFiles(directory="annotated"), name="annotated")
 
-# Create database tables
-database.Base.metadata.create_all(bind=database.engine)
-
 # Dependency to get DB session
 def get_db():
+    # Runs on a threadpool worker, so blocking here does not stall the event loop
+    if not db_ready.wait(timeout=DB_INIT_TIMEOUT):
+        raise HTTPException(status_code=503, detail="Database is still initialising", headers={"Retry-After": "5"})
     db = database.SessionLocal()
     try:
         yield db
     finally:
         db.close()
 
+def is_admin(request: Request):
+    token = request.headers.get("x-admin-token")
+    return bool(ADMIN_TOKEN) and token is not None and secrets.compare_digest(token, ADMIN_TOKEN)
+
+def require_admin(request: Request):
+    if not is_admin(request):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+# Opt-in profiling: "X-Profile: 1" from an admin, or a PROFILE_SAMPLE_RATE sample
+async def upload_profile(request: Request):
+    requested = request.headers.get("x-profile") == "1" and is_admin(request)
+    profile = profiling.start("upload") if profiling.should_profile(requested) else None
+    try:
+        yield profile
+    finally:
+        if profile is not None:
+            # Profiling is diagnostics only; it must never change the response
+            try:
+                profile_id = profiling.finish(profile)
+            except Exception:
+                logger.exception("Saving upload profile failed")
+            else:
+                if profile_id is not None:
+                    logger.info(f"Saved profile {profile_id}")
+
 @app.get("/")
 def read_root():
     return {"message": "Corrosion Detection API is running!"}
 
+# ✅ Liveness: answers as soon as the process is up
+@app.get("/healthz")
+def healthz():
+    return {"status": "ok"}
+
+# ✅ Readiness: database and model initialised
+@app.get("/readyz")
+def readyz():
+    ready = db_ready.is_set() and model_ready.is_set() and not startup_report["errors"]
+    body = {"ready": ready, "database": db_ready.is_set(), "model": model_ready.is_set(), **startup_report}
+    return JSONResponse(body, status_code=200 if ready else 503)
+
+# ✅ Where startup time went
+@app.get("/startup")
+def get_startup_report():
+    return startup_report
+
 @app.post("/upload", response_model=schemas.InspectionResponse)
 async def upload_image(
     file: UploadFile = File(...),
     project_id: str = Form("default"),
     project_description: str = Form(None),
-    db: Session = Depends(get_db)
+    reuse_duplicates: bool = Form(False),
+    db: Session = Depends(get_db),
+    profile: profiling.RequestProfile = Depends(upload_profile)
 ):
     logger.info("Upload request received")
+    if profile is not None:
+        profile.resume()
+        profile.meta.update(filename=file.filename, content_type=file.content_type, size_bytes=file.size)
+    try:
+        return await process_upload(file, project_id, project_description, reuse_duplicates, db, profile)
+    finally:
+        if profile is not None:
+            # Response serialisation and sending run interleaved with other requests; keep them out
+            profile.pause()
 
+async def process_upload(file, project_id, project_description, reuse_duplicates, db, profile):
     if not file.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="File must be an image")
 
-    try:
-        image = Image.open(file.file).convert("RGB")
-    except Exception:
-        raise HTTPException(status_code=400, detail="Invalid image file")
+    loop = asyncio.get_event_loop()
+
+    # Decoding, hashing, the duplicate lookup and the database commit all block;
+    # they run on the default executor so the event loop (and live sockets) keep moving
+    def prepare():
+        try:
+            with profiling.stage("decode"):
+                image = imaging.decode_image(file.file, max_pixels=limits.MAX_IMAGE_PIXELS)
+        except (imaging.ImageTooLarge, Image.DecompressionBombError) as e:
+            # Pillow refuses images far past its own pixel limit inside Image.open(), before our check
+            raise HTTPException(status_code=413, detail=str(e))
+        except Exception:
+            raise HTTPException(status_code=400, detail="Invalid image file")
+
+        info = inspections.describe(db, image, project_id)
+        if reuse_duplicates and info["duplicate"] is not None:
+            # mask_rle is deferred; load it here rather than lazily on the event loop
+            db.refresh(info["duplicate"], attribute_names=["mask_rle"])
+        return image, info
+
+    image, info = await profiling.run_in_executor(loop, None, prepare, profile, "prepare")
+    if profile is not None:
+        profile.meta["decoded_size"] = image.size
+    duplicate = info["duplicate"]
+
+    # Only reuse detections the current model produced; a swapped-in version may disagree.
+    # dHash ignores colour, which is most of what tells rust apart, so that must match too
+    if reuse_duplicates and duplicate is not None and duplicate.model_version is not None \
+            and duplicate.model_version == model.current_version() \
+            and dedup.colors_match(info["image_color"], duplicate.mean_color):
+        # Near-identical shot of something already inspected: reuse its detections
+        logger.info(f"Reusing detections from near-duplicate inspection {duplicate.id}")
+        results = {
+            "label": duplicate.prediction,
+            "confidence": duplicate.confidence,
+            "model_version": duplicate.model_version,
+            "detections": duplicate.detections,
+            "coverage": duplicate.corrosion_coverage,
+            "mask_rle": duplicate.mask_rle
+        }
+    else:
+        def run_prediction():
+            return model.predict_with_boxes(image)
+
+        try:
+            results = await profiling.run_in_executor(loop, thread_pool, run_prediction, profile)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
 
-    def run_prediction():
-        return model.predict_with_boxes(image)
+    def save():
+        # The upload is archived byte-for-byte: the decoded image may be downscaled,
+        # and re-encoding would only lose quality
+        try:
+            inspection = inspections.build_inspection(
+                db, results, info, f"{uuid4()}_{file.filename}", file.file,
+                image_metadata={"filename": file.filename, "content_type": file.content_type},
+                project_id=project_id, project_description=project_description
+            )
+        except OSError as e:
+            raise HTTPException(status_code=500, detail="Failed to save image")
+        try:
+            db.commit()
+            db.refresh(inspection)
+        except Exception as e:
+            db.rollback()
+            raise HTTPException(status_code=500, detail="Database save failed")
+        return inspection
 
+    inspection = await profiling.run_in_executor(loop, None, save, profile, "save")
+    return inspection
+
+# Video ingestion jobs are tracked in the database, so a job started by one
+# worker process can be polled through any other
+VIDEO_PROGRESS_FIELDS = ("fps", "duration_s", "frames_read", "frames_sampled", "frames_inferred", "segments")
+
+def update_video_job(job_id, **fields):
+    db = database.SessionLocal()
     try:
-        loop = asyncio.get_event_loop()
-        results = await loop.run_in_executor(thread_pool, run_prediction)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
+        db.query(database.VideoJob).filter(database.VideoJob.job_id == job_id).update(fields, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
 
-    filename = f"{uuid4()}_{file.filename}"
-    annotated_filename = f"annotated_{filename}"
+def video_progress(stats):
+    fields = {name: stats[name] for name in VIDEO_PROGRESS_FIELDS if name in stats}
+    fields["segments"] = list(stats["segments"])
+    return fields
 
-    original_path = os.path.join("uploads", filename)
+def run_video_job(job_id, path, filename, project_id, project_description, max_fps):
+    update_video_job(job_id, status="running")
+    latest = {"segments": []}
+    last_write = 0.0
+
+    def infer(images):
+        return thread_pool.submit(model.predict_batch, images).result()
+
+    def progress(stats):
+        nonlocal latest, last_write
+        latest = stats
+        # At most one progress write a second, however quick the batches are
+        if time.perf_counter() - last_write >= 1:
+            last_write = time.perf_counter()
+            update_video_job(job_id, **video_progress(stats))
+
+    db = database.SessionLocal()
     try:
-        image.save(original_path, "JPEG", quality=95)
+        latest = video.ingest(path, db, infer, project_id=project_id, project_description=project_description,
+                              source_video=filename, progress=progress, max_fps=max_fps)
+        update_video_job(job_id, status="done", finished_at=datetime.utcnow(), **video_progress(latest))
     except Exception as e:
-        raise HTTPException(status_code=500, detail="Failed to save original image")
+        logger.exception(f"Video job {job_id} failed")
+        db.rollback()
+        update_video_job(job_id, status="failed", error=str(e), finished_at=datetime.utcnow(), **video_progress(latest))
+    finally:
+        db.close()
+        os.remove(path)
 
-    annotated_path = os.path.join("annotated", annotated_filename)
+# ✅ Upload a video for background ingestion
+@app.post("/videos", response_model=schemas.VideoJob, status_code=202)
+def upload_video(
+    file: UploadFile = File(...),
+    project_id: str = Form("default"),
+    project_description: str = Form(None),
+    max_fps: float = Form(video.VIDEO_MAX_FPS),
+    db: Session = Depends(get_db)
+):
+    if not file.content_type.startswith("video/"):
+        raise HTTPException(status_code=400, detail="File must be a video")
+    if max_fps <= 0:
+        raise HTTPException(status_code=400, detail="max_fps must be positive")
+
+    job_id = uuid4().hex
+    path = os.path.join("videos", f"{job_id}_{os.path.basename(file.filename)}")
     try:
-        save_img = results["annotated_image"].convert("RGB")
-        save_img.save(annotated_path, "JPEG", quality=95)
+        with open(path, "wb") as out:
+            shutil.copyfileobj(file.file, out)
     except Exception as e:
-        raise HTTPException(status_code=500, detail="Failed to save annotated image")
-
-    inspection = database.Inspection(
-        image_path=f"/images/{filename}",
-        annotated_path=f"/annotated/{annotated_filename}",
-        prediction=results["label"],
-        confidence=results["confidence"],
-        image_metadata={"filename": file.filename, "content_type": file.content_type},
-        project_id=project_id,
-        project_description=project_description
-    )
-    db.add(inspection)
+        raise HTTPException(status_code=500, detail="Failed to save video")
+
+    VideoJob = database.VideoJob
+    job = VideoJob(job_id=job_id, status="queued", filename=file.filename, project_id=project_id,
+                   project_description=project_description, submitted_at=datetime.utcnow(), segments=[])
+    db.add(job)
+    # Only the newest VIDEO_JOBS_KEEP finished jobs are remembered
+    finished = VideoJob.status.in_(("done", "failed"))
+    cutoff = db.query(VideoJob.submitted_at).filter(finished).order_by(
+        VideoJob.submitted_at.desc()
+    ).offset(VIDEO_JOBS_KEEP - 1).limit(1).scalar()
+    if cutoff is not None:
+        db.query(VideoJob).filter(finished, VideoJob.submitted_at < cutoff).delete(synchronize_session=False)
     try:
         db.commit()
-        db.refresh(inspection)
+        db.refresh(job)
     except Exception as e:
         db.rollback()
+        os.remove(path)
         raise HTTPException(status_code=500, detail="Database save failed")
 
-    return inspection
+    video_pool.submit(run_video_job, job_id, path, file.filename, project_id, project_description, max_fps)
+    return job
+
+# ✅ Video ingestion progress
+@app.get("/videos/jobs/{job_id}", response_model=schemas.VideoJob)
+def get_video_job(job_id: str, db: Session = Depends(get_db)):
+    job = db.query(database.VideoJob).filter(database.VideoJob.job_id == job_id).first()
+    if job is None:
+        raise HTTPException(status_code=404, detail="Video job not found")
+    return job
+
+# ✅ Segments found in one video
+@app.get("/inspections/video", response_model=list[schemas.InspectionResponse])
+def get_video_segments(source_video: str, project_id: str = "default", db: Session = Depends(get_db)):
+    Inspection = database.Inspection
+    return db.query(Inspection).filter(
+        Inspection.source_video == source_video, Inspection.project_id == project_id
+    ).order_by(Inspection.video_start_s).all()
+
+def save_live_finding(frame_id, data, project_id, project_description):
+    # Same record as an /upload of the frame, including the annotated image and mask
+    image = imaging.decode_image(io.BytesIO(data))
+    results = model.predict_with_boxes(image)
+
+    db_ready.wait()
+    db = database.SessionLocal()
+    try:
+        inspection = inspections.build_inspection(
+            db, results, inspections.describe(db, image, project_id), f"{uuid4()}_live_{frame_id}.jpg", data,
+            image_metadata={"filename": f"live_{frame_id}.jpg", "content_type": "image/jpeg", "source": "live"},
+            project_id=project_id, project_description=project_description
+        )
+        db.commit()
+        return inspection.id
+    finally:
+        db.close()
+
+live_sessions = 0
+
+# ✅ Live camera inspection (protocol in app/live.py)
+@app.websocket("/ws/live")
+async def live_inspection(websocket: WebSocket, project_id: str = "default", project_description: str = None):
+    global live_sessions
+    if live_sessions >= live.LIVE_MAX_SESSIONS:
+        await websocket.close(code=1013, reason="Too many live sessions")
+        return
+    # Claim the slot before the first await, so concurrent handshakes cannot all pass the check
+    live_sessions += 1
+
+    loop = asyncio.get_running_loop()
+    slot = live.LatestFrame()
+    recent = deque(maxlen=live.LIVE_RECENT_FRAMES)
+    pending_saves = set()
+
+    async def send(text):
+        # Results and saves can finish after the client has gone; nothing to tell it then
+        try:
+            await websocket.send_text(text)
+        except (WebSocketDisconnect, RuntimeError):
+            pass
+
+    def run_frame(data):
+        start = time.perf_counter()
+        image = imaging.decode_image(io.BytesIO(data), max_pixels=limits.MAX_IMAGE_PIXELS)
+        decoded = time.perf_counter()
+        result = model.detect(image)
+        timings = {"decode": (decoded - start) * 1000, "infer": (time.perf_counter() - decoded) * 1000}
+        return result, timings
+
+    async def infer_frames():
+        while (item := await slot.get()) is not None:
+            frame_id, data = item
+            try:
+                result, timings = await loop.run_in_executor(live_pool, run_frame, data)
+            except Exception as e:
+                await send(json.dumps({"type": "error", "id": frame_id, "detail": str(e)}))
+                continue
+            await send(live.compact(frame_id, result, timings, slot.dropped))
+
+    async def save_finding(frame_id):
+        data = next((d for i, d in recent if i == frame_id), None)
+        if data is None:
+            await send(json.dumps({"type": "error", "id": frame_id, "detail": "Frame is no longer buffered"}))
+            return
+        try:
+            inspection_id = await loop.run_in_executor(
+                thread_pool, save_live_finding, frame_id, data, project_id, project_description)
+        except Exception as e:
+            logger.exception("Saving live finding failed")
+            await send(json.dumps({"type": "error", "id": frame_id, "detail": str(e)}))
+            return
+        await send(json.dumps({"type": "saved", "id": frame_id, "inspection_id": inspection_id}))
+
+    inference = asyncio.create_task(infer_frames())
+    try:
+        await websocket.accept()
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("bytes") is not None:
+                try:
+                    frame_id, data = live.unpack_frame(message["bytes"])
+                except ValueError as e:
+                    await send(json.dumps({"type": "error", "id": None, "detail": str(e)}))
+                    continue
+                if len(data) > live.LIVE_MAX_FRAME_BYTES:
+                    await send(json.dumps({"type": "error", "id": frame_id, "detail": "Frame is too large"}))
+                    continue
+                recent.append((frame_id, data))
+                slot.put((frame_id, data))
+            elif message.get("text"):
+                try:
+                    request = json.loads(message["text"])
+                except ValueError:
+                    request = {}
+                if request.get("type") == "finding":
+                    task = asyncio.create_task(save_finding(request.get("id")))
+                    pending_saves.add(task)
+                    task.add_done_callback(pending_saves.discard)
+                else:
+                    await send(json.dumps({"type": "error", "id": None, "detail": "Unknown message"}))
+    finally:
+        live_sessions -= 1
+        slot.close()
+        inference.cancel()
 
 # ✅ New: Get latest inspection
 @app.get("/inspections/latest", response_model=schemas.InspectionResponse)
@@ -126,9 +496,234 @@ def get_latest_inspection(db: Session = Depends(get_db)):
 def get_inspections(db: Session = Depends(get_db)):
     return db.query(database.Inspection).all()
 
+# ✅ Corrosion mask for one inspection (RLE as stored, or rendered as PNG)
+@app.get("/inspections/{inspection_id}/mask")
+def get_inspection_mask(inspection_id: int, format: str = "rle", db: Session = Depends(get_db)):
+    row = db.query(database.Inspection.mask_rle, database.Inspection.corrosion_coverage).filter(
+        database.Inspection.id == inspection_id
+    ).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Inspection not found")
+    mask_rle, coverage = row
+    if mask_rle is None:
+        raise HTTPException(status_code=404, detail="No segmentation mask for this inspection")
+    if format == "png":
+        import numpy as np
+        import app.masks as masks
+        buf = io.BytesIO()
+        Image.fromarray(masks.rle_decode(mask_rle).astype(np.uint8) * 255).save(buf, "PNG")
+        return StreamingResponse(iter([buf.getvalue()]), media_type="image/png")
+    return {"inspection_id": inspection_id, "coverage": coverage, "mask": mask_rle}
+
+# ✅ Group near-duplicate shots
+@app.get("/inspections/duplicates", response_model=schemas.DuplicateGroupsResponse)
+def get_duplicate_groups(project_id: str = "default", radius: int = dedup.DUPLICATE_RADIUS, db: Session = Depends(get_db)):
+    if not 0 <= radius <= dedup.MAX_RADIUS:
+        raise HTTPException(status_code=400, detail=f"radius must be between 0 and {dedup.MAX_RADIUS}")
+    groups = dedup.group_duplicates(db, project_id, radius)
+    return {"project_id": project_id, "radius": radius, "groups": groups}
+
+# ✅ Inspections inside a bounding box
+@app.get("/inspections/within", response_model=list[schemas.InspectionResponse])
+def get_inspections_within(
+    min_lat: float, min_lon: float, max_lat: float, max_lon: float,
+    prediction: str = None, limit: int = 500,
+    db: Session = Depends(get_db)
+):
+    if not (-90 <= min_lat <= max_lat <= 90 and -180 <= min_lon <= max_lon <= 180):
+        raise HTTPException(status_code=400, detail="Invalid bounding box")
+    return geo.query_bbox(db, min_lat, min_lon, max_lat, max_lon, prediction).limit(limit).all()
+
+# ✅ Inspections within a radius, nearest first
+@app.get("/inspections/nearby", response_model=list[schemas.NearbyInspection])
+def get_inspections_nearby(
+    lat: float, lon: float, radius_m: float = 500, prediction: str = None, limit: int = 100,
+    db: Session = Depends(get_db)
+):
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180) or radius_m <= 0:
+        raise HTTPException(status_code=400, detail="Invalid location or radius")
+    matches = geo.query_radius(db, lat, lon, radius_m, prediction, limit)
+    return [
+        {**schemas.InspectionResponse.model_validate(inspection).model_dump(), "distance_m": distance}
+        for inspection, distance in matches
+    ]
+
+# ✅ Capture timeline for a project
+@app.get("/inspections/timeline", response_model=list[schemas.InspectionResponse])
+def get_timeline(
+    project_id: str = "default", start: datetime = None, end: datetime = None, limit: int = 1000,
+    db: Session = Depends(get_db)
+):
+    Inspection = database.Inspection
+    query = db.query(Inspection).filter(Inspection.project_id == project_id, Inspection.captured_at.isnot(None))
+    if start is not None:
+        query = query.filter(Inspection.captured_at >= start)
+    if end is not None:
+        query = query.filter(Inspection.captured_at < end)
+    return query.order_by(Inspection.captured_at).limit(limit).all()
+
+# ✅ Bulk corrections
+@app.post("/inspections/corrections", response_model=schemas.CorrectionsResponse)
+def submit_corrections(request: schemas.CorrectionsRequest, db: Session = Depends(get_db)):
+    # Last entry wins if the same inspection is corrected twice in one batch
+    labels = {c.inspection_id: c.corrected_label for c in request.corrections}
+    corrected_at = datetime.utcnow()
+
+    # Lock the rows so concurrent corrections of the same inspection read old_label
+    # one after the other; id order keeps overlapping batches from deadlocking
+    inspections = db.query(database.Inspection).filter(
+        database.Inspection.id.in_(labels.keys())
+    ).order_by(database.Inspection.id).with_for_update().all()
+    found = set()
+    for inspection in inspections:
+        old_label = rollups.effective_label(inspection)
+        inspection.is_corrected = True
+        inspection.corrected_label = labels[inspection.id]
+        inspection.corrected_at = corrected_at
+        rollups.record_correction(db, inspection, old_label)
+        found.add(inspection.id)
+
+    try:
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail="Database save failed")
+
+    return {
+        "updated": len(found),
+        "missing": sorted(set(labels) - found),
+        "corrected_at": corrected_at
+    }
+
+# ✅ Manual markup layers for one inspection
+@app.get("/inspections/{inspection_id}/layers", response_model=list[schemas.AnnotationLayerResponse])
+def get_annotation_layers(inspection_id: int, db: Session = Depends(get_db)):
+    if db.query(database.Inspection.id).filter(database.Inspection.id == inspection_id).first() is None:
+        raise HTTPException(status_code=404, detail="Inspection not found")
+    return db.query(database.AnnotationLayer).filter(
+        database.AnnotationLayer.inspection_id == inspection_id
+    ).order_by(database.AnnotationLayer.id).all()
+
+# ✅ Edit a markup layer by delta (409 if base_version is stale)
+@app.patch("/inspections/{inspection_id}/layers/{name}", response_model=schemas.AnnotationLayerResponse)
+def update_annotation_layer(
+    inspection_id: int,
+    delta: schemas.LayerDelta,
+    name: str = Path(..., max_length=64, pattern=r"^[A-Za-z0-9_\-]+$"),
+    db: Session = Depends(get_db)
+):
+    if db.query(database.Inspection.id).filter(database.Inspection.id == inspection_id).first() is None:
+        raise HTTPException(status_code=404, detail="Inspection not found")
+    try:
+        layer = annotations.update_layer(
+            db, inspection_id, name, delta.base_version,
+            add=[s.model_dump() for s in delta.add],
+            update=[s.model_dump() for s in delta.update],
+            remove=delta.remove
+        )
+        db.commit()
+    except annotations.LayerConflict as e:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    except IntegrityError:
+        # Another request created the same layer first
+        db.rollback()
+        raise HTTPException(status_code=409, detail=f"Layer {name!r} was changed by another request")
+    db.refresh(layer)
+    return layer
+
+# ✅ Inspection image with markup layers composited (rendered once per layer version)
+@app.get("/inspections/{inspection_id}/export")
+def export_inspection_image(
+    inspection_id: int, base: str = "original", format: str = "jpeg", layers: str = None,
+    db: Session = Depends(get_db)
+):
+    if base not in annotations.BASES:
+        raise HTTPException(status_code=400, detail=f"base must be one of {', '.join(annotations.BASES)}")
+    if format not in annotations.FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(annotations.FORMATS)}")
+    inspection = db.query(database.Inspection).filter(database.Inspection.id == inspection_id).first()
+    if inspection is None:
+        raise HTTPException(status_code=404, detail="Inspection not found")
+
+    query = db.query(database.AnnotationLayer).filter(database.AnnotationLayer.inspection_id == inspection_id)
+    if layers:
+        query = query.filter(database.AnnotationLayer.name.in_(layers.split(",")))
+    selected = query.order_by(database.AnnotationLayer.id).all()
+
+    try:
+        path = annotations.export(inspection, base, selected, format)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"The {base} image for this inspection is missing")
+    _, ext, media_type = annotations.FORMATS[format]
+    return FileResponse(path, media_type=media_type, filename=f"inspection_{inspection_id}_marked.{ext}")
+
+# ✅ Project trends, served from the daily rollups
+@app.get("/projects/{project_id}/trends", response_model=list[schemas.TrendPoint])
+def get_project_trends(
+    project_id: str, kind: str = rollups.EFFECTIVE, bucket: str = "day",
+    start: date = None, end: date = None,
+    db: Session = Depends(get_db)
+):
+    if kind not in rollups.KINDS:
+        raise HTTPException(status_code=400, detail=f"kind must be one of {', '.join(rollups.KINDS)}")
+    if bucket not in ("day", "month"):
+        raise HTTPException(status_code=400, detail="bucket must be 'day' or 'month'")
+    return rollups.trends(db, project_id, kind, start, end, bucket)
+
+# ✅ Model registry (admin)
+@app.get("/admin/models", dependencies=[Depends(require_admin)])
+def list_models():
+    return {
+        "serving": model.current_version(),
+        "registry": registry.read_active(),
+        "swap": model.swap_status,
+        "versions": registry.list_versions()
+    }
+
+def start_model_swap(version, rollback=False):
+    try:
+        model.swap_to(version, rollback=rollback)
+    except registry.UnknownVersion as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return JSONResponse({"status": "loading", "version": version}, status_code=202)
+
+@app.post("/admin/models/{version}/activate", dependencies=[Depends(require_admin)])
+def activate_model(version: str):
+    return start_model_swap(version)
+
+@app.post("/admin/models/rollback", dependencies=[Depends(require_admin)])
+def rollback_model():
+    version = registry.previous_version()
+    if version is None:
+        raise HTTPException(status_code=409, detail="No previous model version to roll back to")
+    return start_model_swap(version, rollback=True)
+
+# ✅ Saved request profiles (admin)
+@app.get("/admin/profiles", dependencies=[Depends(require_admin)])
+def list_profiles():
+    return profiling.list_profiles()
+
+@app.get("/admin/profiles/{profile_id}", dependencies=[Depends(require_admin)])
+def download_profile(profile_id: str, format: str = "prof"):
+    path = profiling.profile_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "text":
+        return PlainTextResponse(profiling.profile_text(path))
+    return FileResponse(path, media_type="application/octet-stream", filename=os.path.basename(path))
+
 # ✅ Export to CSV
 @app.get("/inspections/export")
 def export_to_csv(db: Session = Depends(get_db)):
+    # pandas costs hundreds of ms to import and is only needed here
+    import pandas as pd
+
     inspections = db.query(database.Inspection).all()
     data = [{
         "id": i.id,
@@ -146,4 +741,6 @@ def export_to_csv(db: Session = Depends(get_db)):
     df.to_csv(stream, index=False)
     response = StreamingResponse(iter([stream.getvalue()]), media_type="text/csv")
     response.headers["Content-Disposition"] = "attachment; filename=corrosion_inspections.csv"
-    return response
\ No newline at end of file
+    return response
+
+startup_report["import_ms"] = (time.perf_counter() - _import_started) * 1000
@@ -0,0 +1,51 @@
+# app/masks.py
+#
+# Segmentation masks are kept at model resolution (the letterboxed ~640px
+# input), never upsampled per instance to the photo's full size: coverage is
+# a ratio, so it comes out the same at either resolution for a fraction of
+# the memory. Masks are stored run-length encoded.
+
+import numpy as np
+
+
+def letterbox_crop(masks, orig_shape):
+    """Crop the letterbox padding off [N, H, W] masks.
+
+    orig_shape is (height, width) of the image the model was given.
+    """
+    mask_h, mask_w = masks.shape[-2:]
+    orig_h, orig_w = orig_shape
+    gain = min(mask_h / orig_h, mask_w / orig_w)
+    pad_h = (mask_h - orig_h * gain) / 2
+    pad_w = (mask_w - orig_w * gain) / 2
+    top, left = int(round(pad_h - 0.1)), int(round(pad_w - 0.1))
+    bottom, right = int(round(mask_h - pad_h + 0.1)), int(round(mask_w - pad_w + 0.1))
+    return masks[..., top:bottom, left:right]
+
+
+def union(masks):
+    """Single HxW boolean mask covering every instance in an [N, H, W] stack."""
+    return (masks > 0.5).any(axis=0)
+
+
+def coverage(mask):
+    return float(mask.mean()) if mask.size else 0.0
+
+
+def rle_encode(mask):
+    """Row-major RLE of a boolean mask: alternating run lengths, starting with 0s."""
+    flat = np.asarray(mask, dtype=bool).ravel()
+    # Indices where the value changes, plus both ends
+    changes = np.flatnonzero(flat[1:] != flat[:-1]) + 1
+    bounds = np.concatenate(([0], changes, [flat.size]))
+    counts = np.diff(bounds).tolist()
+    if flat.size and flat[0]:
+        counts.insert(0, 0)
+    return {"size": list(mask.shape), "counts": counts}
+
+
+def rle_decode(rle):
+    height, width = rle["size"]
+    counts = np.asarray(rle["counts"], dtype=np.int64)
+    values = np.arange(counts.size) % 2 == 1
+    return np.repeat(values, counts).reshape(height, width)
@@ -1,64 +1,283 @@
 # app/model.py
 
-from PIL import Image, ImageDraw
-from ultralytics import YOLO
+from PIL import Image, ImageDraw, ImageStat
 import os
-import numpy as np
-import cv2
+import threading
+import time
+
+import app.profiling as profiling
+import app.registry as registry
 
 MODEL_PATH = "models/corrosion_model.pt"
-model = None
+
+# (YOLO model, version) swapped as one reference, so a prediction that has
+# started keeps using the model it started with while a new one is swapped in
+_active = None
+_load_lock = threading.Lock()
+# A second instance for live frames: ultralytics serialises every call on one
+# instance behind its predictor lock, so sharing it would queue live frames
+# behind uploads and whole video batches. Loaded on first live frame.
+_live = None
+_live_lock = threading.Lock()
+swap_status = {"state": "idle", "version": None, "error": None}
+# How often each worker checks the registry for a version activated elsewhere
+REGISTRY_POLL_SECONDS = float(os.getenv("REGISTRY_POLL_SECONDS", 5))
+_last_poll = 0.0
+_seen_mtime = None
+# Versions this process failed to load; following the registry will not retry them
+_failed_versions = set()
+
+CONF_THRESHOLD = 0.05
+CORROSION_CLASSES = ["corrosion", "rust", "segmentation"]
+
+# Deterministic stand-in for load tests: no weights, fixed latency
+STUB_MODEL = os.getenv("STUB_MODEL") == "1"
+STUB_LATENCY_MS = float(os.getenv("STUB_LATENCY_MS", 50))
+# Like the real model, each stub instance runs one call at a time
+_stub_locks = {"shared": threading.Lock(), "live": threading.Lock()}
+
+def _load_weights(path):
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Model not found at {path}")
+    # ultralytics pulls in torch and cv2 (~seconds), so only import it when loading
+    from ultralytics import YOLO
+    loaded = YOLO(path)
+    print(f"✅ Loaded model from {path}")
+    print(f"🔧 Model task: {loaded.model.task}")
+    print(f"🏷️  Model names: {loaded.model.names}")
+    return loaded
+
+def _warm(loaded):
+    # First inference pays for lazy init (fusing, allocator warm-up); do it off the request path
+    loaded(Image.new("RGB", (640, 640)), imgsz=640, conf=CONF_THRESHOLD, verbose=False)
+
+def active_model():
+    """Return (model, version), loading and warming the registry's active version on first use."""
+    global _active
+    if _active is None:
+        with _load_lock:
+            if _active is None:
+                path, version = registry.resolve_active(MODEL_PATH)
+                loaded = _load_weights(path)
+                _warm(loaded)
+                _active = (loaded, version)
+    return _active
 
 def load_model():
-    global model
-    if model is None:
-        if not os.path.exists(MODEL_PATH):
-            raise FileNotFoundError(f"Model not found at {MODEL_PATH}")
-        model = YOLO(MODEL_PATH)
-        print(f"✅ Loaded model from {MODEL_PATH}")
-        print(f"🔧 Model task: {model.model.task}")
-        print(f"🏷️  Model names: {model.model.names}")
-    return model
+    return active_model()[0]
+
+def _weights_for(version):
+    try:
+        return registry.weights_path(version)
+    except registry.UnknownVersion:
+        # Not in the registry: the legacy MODEL_PATH deployment
+        return MODEL_PATH
+
+def live_model():
+    """(model, version) for live frames: its own instance of the serving version."""
+    global _live
+    version = active_model()[1]
+    if _live is None or _live[1] != version:
+        with _live_lock:
+            if _live is None or _live[1] != version:
+                loaded = _load_weights(_weights_for(version))
+                _warm(loaded)
+                _live = (loaded, version)
+    return _live
+
+def current_version():
+    if STUB_MODEL:
+        return "stub"
+    return _active[1] if _active is not None else None
+
+def swap_to(version, rollback=False):
+    """Load and warm `version` on a background thread, then swap it in.
+
+    In-flight predictions finish on the old model; the next one picks up the
+    new one. rollback=True drops the version being replaced from the registry
+    history. Raises registry.UnknownVersion or RuntimeError if a swap is
+    already running.
+    """
+    registry.weights_path(version)
+    with _load_lock:
+        if swap_status["state"] == "loading":
+            raise RuntimeError(f"Already loading model version {swap_status['version']}")
+        swap_status.update(state="loading", version=version, error=None)
+    threading.Thread(target=_swap, args=(version, rollback), name=f"model-swap-{version}", daemon=True).start()
+
+def _swap(version, rollback=False):
+    global _active, _live
+    try:
+        loaded = _load_weights(registry.weights_path(version))
+        _warm(loaded)
+        live_copy = None
+        if _live is not None:
+            live_copy = _load_weights(registry.weights_path(version))
+            _warm(live_copy)
+        _active = (loaded, version)
+        if live_copy is not None:
+            _live = (live_copy, version)
+        registry.set_active(version, rollback=rollback)
+        _failed_versions.discard(version)
+        swap_status.update(state="idle", error=None)
+        print(f"🔁 Swapped in model version {version}")
+    except Exception as e:
+        _failed_versions.add(version)
+        swap_status.update(state="failed", error=str(e))
+        print(f"❌ Failed to swap in model version {version}: {e}")
+
+def follow_registry():
+    """Pick up a version activated by another worker process.
+
+    One stat of active.json every REGISTRY_POLL_SECONDS; the file is only read
+    when its mtime has changed.
+    """
+    global _last_poll, _seen_mtime
+    now = time.monotonic()
+    if STUB_MODEL or _active is None or now - _last_poll < REGISTRY_POLL_SECONDS:
+        return
+    _last_poll = now
+    mtime = registry.active_mtime()
+    # While a swap is loading, leave the change unseen so it is looked at again afterwards
+    if mtime == _seen_mtime or swap_status["state"] == "loading":
+        return
+    _seen_mtime = mtime
+    wanted = registry.read_active()["active"]
+    if wanted and wanted != _active[1] and wanted not in _failed_versions:
+        try:
+            swap_to(wanted)
+        except (RuntimeError, registry.UnknownVersion):
+            pass
 
 def predict(image: Image.Image):
     results = predict_with_boxes(image)
     return results["label"], results["confidence"]
 
+def predict_stub(image: Image.Image, preview=False, instance="shared"):
+    with _stub_locks[instance]:
+        time.sleep(STUB_LATENCY_MS / 1000)
+    # Reddish-brown images count as corrosion, so results depend only on the pixels
+    r, g, b = ImageStat.Stat(image.convert("RGB").resize((32, 32))).mean
+    has_corrosion = r > g * 1.1 and r > b * 1.1
+
+    w, h = image.size
+    result = {
+        "label": "corrosion" if has_corrosion else "no_corrosion",
+        "confidence": 0.99 if has_corrosion else 0.01,
+        "model_version": "stub",
+        "detections": [{"label": "corrosion", "confidence": 0.99, "box": [0.25, 0.25, 0.75, 0.75]}] if has_corrosion else [],
+        "coverage": 0.25 if has_corrosion else 0.0,
+        "mask_rle": None
+    }
+    if not preview:
+        annotated_image = image.copy()
+        if has_corrosion:
+            draw_dashed_rectangle(ImageDraw.Draw(annotated_image), (w / 4, h / 4, 3 * w / 4, 3 * h / 4),
+                                  dash_length=6, gap_length=4, outline=(255, 0, 0), width=1)
+        result["annotated_image"] = annotated_image
+    return result
+
 def predict_with_boxes(image: Image.Image):
-    model = load_model()
-    results = model(image, imgsz=640, conf=0.05)
-    r = results[0]
+    return predict_batch([image])[0]
 
-    annotated_image = image.copy()
-    draw = ImageDraw.Draw(annotated_image)
+def detect(image: Image.Image):
+    """Detections only, for live preview: no annotated image, no mask RLE; runs on the live instance."""
+    if STUB_MODEL:
+        return predict_stub(image, preview=True, instance="live")
 
-    has_corrosion = False
+    follow_registry()
+    model, version = live_model()
+    with profiling.stage("ultralytics"):
+        results = model(image, imgsz=640, conf=CONF_THRESHOLD)
+    return postprocess(model, version, image, results[0], preview=True)
+
+def predict_batch(images, preview=False):
+    """Run several images through the model in one call (video frames, bulk imports)."""
+    if STUB_MODEL:
+        return [predict_stub(image, preview) for image in images]
+
+    follow_registry()
+    model, version = active_model()
+    with profiling.stage("ultralytics"):
+        results = model(list(images), imgsz=640, conf=CONF_THRESHOLD)
+    return [postprocess(model, version, image, r, preview) for image, r in zip(images, results)]
+
+def postprocess(model, version, image: Image.Image, r, preview=False):
+    detections = []
+    mask = None
 
     if len(r.boxes) > 0:
-        boxes = []
-        for box in r.boxes:
-            cls_id = int(box.cls.item())
-            class_name = model.model.names[cls_id]
-            if class_name.lower() in ["corrosion", "rust", "segmentation"]:
-                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                boxes.append([x1, y1, x2, y2])
-
-        if boxes:
-            boxes = np.array(boxes)
-            indices = cv2.dnn.NMSBoxes(boxes.tolist(), [1.0]*len(boxes), 0.1, 0.3)
-            for i in indices.flatten():
-                x1, y1, x2, y2 = boxes[i]
-                draw_dashed_rectangle(draw, (x1, y1, x2, y2), dash_length=6, gap_length=4, outline=(255, 0, 0), width=1)
-                has_corrosion = True
+        import cv2
+        import numpy as np
+        import app.masks as masks
+
+        names = model.model.names
+        cls_ids = r.boxes.cls.cpu().numpy().astype(int)
+        candidates = np.flatnonzero([names[c].lower() in CORROSION_CLASSES for c in cls_ids])
 
+        if candidates.size:
+            boxes = r.boxes.xyxy.cpu().numpy()[candidates]
+            # Stored boxes are fractions of the image: the decoded image is usually a
+            # downscaled copy of the archived original, so pixels would not line up with it
+            boxes_n = r.boxes.xyxyn.cpu().numpy()[candidates]
+            scores = r.boxes.conf.cpu().numpy()[candidates]
+            # NMSBoxes expects (x, y, w, h)
+            xywh = np.column_stack([boxes[:, :2], boxes[:, 2:] - boxes[:, :2]])
+            kept = np.asarray(cv2.dnn.NMSBoxes(xywh.tolist(), scores.tolist(), CONF_THRESHOLD, 0.3), dtype=int).flatten()
+
+            for i in kept:
+                detections.append({
+                    "label": names[cls_ids[candidates[i]]],
+                    "confidence": float(scores[i]),
+                    "box": [round(float(v), 5) for v in boxes_n[i]]
+                })
+
+            if r.masks is not None and kept.size:
+                # Union at model resolution; only the kept instances, padding cropped off
+                instance_masks = r.masks.data[candidates[kept]].cpu().numpy()
+                mask = masks.union(masks.letterbox_crop(instance_masks, r.orig_shape))
+
+    has_corrosion = bool(detections)
     label = "corrosion" if has_corrosion else "no_corrosion"
-    confidence = 0.99 if has_corrosion else 0.01
+    # Nothing at or above the detection threshold counts as that much evidence against
+    confidence = max(d["confidence"] for d in detections) if has_corrosion else 1.0 - CONF_THRESHOLD
 
-    return {
+    result = {
         "label": label,
         "confidence": confidence,
-        "annotated_image": annotated_image
+        "model_version": version,
+        "detections": detections,
+        "coverage": None,
+        "mask_rle": None
     }
+    if mask is not None:
+        result["coverage"] = masks.coverage(mask)
+        if not preview:
+            result["mask_rle"] = masks.rle_encode(mask)
+    elif model.model.task == "segment":
+        # A segmentation model that found nothing: 0% rather than unknown
+        result["coverage"] = 0.0
+
+    if not preview:
+        annotated_image = overlay_mask(image, mask) if mask is not None else image.copy()
+        draw = ImageDraw.Draw(annotated_image)
+        w, h = image.size
+        for detection in detections:
+            x1, y1, x2, y2 = detection["box"]
+            draw_dashed_rectangle(draw, (x1 * w, y1 * h, x2 * w, y2 * h), dash_length=6, gap_length=4, outline=(255, 0, 0), width=1)
+        result["annotated_image"] = annotated_image
+    return result
+
+def predict_with_mask(image: Image.Image):
+    # Older callers (root main.py) use this name; masks are part of predict_with_boxes now
+    return predict_with_boxes(image)
+
+def overlay_mask(image, mask, color=(255, 0, 0), alpha=0.35):
+    import numpy as np
+
+    # One upsample of the single union mask, at the decoded image's size, for display only
+    alpha_mask = Image.fromarray(mask.astype(np.uint8) * int(255 * alpha)).resize(image.size, Image.NEAREST)
+    return Image.composite(Image.new("RGB", image.size, color), image, alpha_mask)
 
 def draw_dashed_rectangle(draw, xy, dash_length=5, gap_length=5, outline="black", width=1):
     x1, y1, x2, y2 = xy
@@ -0,0 +1,194 @@
+# app/profiling.py
+
+import cProfile
+import contextvars
+import io
+import json
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from uuid import uuid4
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", 50))
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+
+_current = contextvars.ContextVar("request_profile", default=None)
+_NULL_STAGE = nullcontext()
+# cProfile can only have one active profiler per thread, so the event loop
+# thread profiles one request at a time; others just run unprofiled
+_loop_profile_busy = False
+_write_lock = threading.Lock()
+
+
+def should_profile(requested: bool) -> bool:
+    if requested:
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def stage(name):
+    """Time a named stage of the current request; a shared no-op when not profiling."""
+    profile = _current.get()
+    return profile.stage(name) if profile is not None else _NULL_STAGE
+
+
+def torch_settings() -> dict:
+    settings = {k: os.environ[k] for k in ("OMP_NUM_THREADS", "MKL_NUM_THREADS") if k in os.environ}
+    torch = sys.modules.get("torch")  # only report it if it is already loaded
+    if torch is not None:
+        settings["torch_num_threads"] = torch.get_num_threads()
+        settings["torch_num_interop_threads"] = torch.get_num_interop_threads()
+        settings["torch_version"] = torch.__version__
+    return settings
+
+
+class RequestProfile:
+    """cProfile + stage timings for one request, spanning the event loop and executor.
+
+    The event-loop profiler must be paused across awaits, otherwise it would
+    pick up whatever other requests run on the loop meanwhile; run() profiles
+    the executor side with its own profiler and the two are merged on save.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.started_at = datetime.utcnow()
+        self.stages = {}
+        self.meta = {}
+        self.loop_profiler = cProfile.Profile()
+        self.worker_profilers = []
+        self.active = False
+        # False until some profiler has run; a request rejected before the
+        # endpoint body (e.g. a 422) never gets that far
+        self.used = False
+        self.wall_start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + (time.perf_counter() - start) * 1000
+
+    def resume(self):
+        if not self.active:
+            self.loop_profiler.enable()
+            self.active = True
+            self.used = True
+            _current.set(self)
+
+    def pause(self):
+        if self.active:
+            self.loop_profiler.disable()
+            self.active = False
+
+    def run(self, fn, *args):
+        """Run fn (on an executor thread) under a profiler of its own."""
+        profiler = cProfile.Profile()
+        token = _current.set(self)
+        self.used = True
+        profiler.enable()
+        try:
+            return fn(*args)
+        finally:
+            profiler.disable()
+            _current.reset(token)
+            self.worker_profilers.append(profiler)
+
+    def save(self):
+        """Write the profile; returns its id, or None if nothing was profiled."""
+        self.pause()
+        if not self.used:
+            return None
+        stats = pstats.Stats(self.loop_profiler)
+        for profiler in self.worker_profilers:
+            stats.add(profiler)
+
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        base = f"{self.started_at.strftime('%Y%m%dT%H%M%S%f')}_{self.name}_{uuid4().hex[:8]}"
+        stats.dump_stats(os.path.join(PROFILE_DIR, base + ".prof"))
+        summary = {
+            "name": self.name,
+            "started_at": self.started_at.isoformat(),
+            "wall_ms": (time.perf_counter() - self.wall_start) * 1000,
+            "stages_ms": self.stages,
+            "torch": torch_settings(),
+            **self.meta
+        }
+        with open(os.path.join(PROFILE_DIR, base + ".json"), "w") as f:
+            json.dump(summary, f, indent=2, default=str)
+        prune()
+        return base
+
+
+def start(name):
+    """Create a profile for the calling request, or None if one is already running."""
+    global _loop_profile_busy
+    if _loop_profile_busy:
+        return None
+    _loop_profile_busy = True
+    return RequestProfile(name)
+
+
+def finish(profile):
+    global _loop_profile_busy
+    try:
+        return profile.save()
+    finally:
+        _loop_profile_busy = False
+
+
+async def run_in_executor(loop, executor, fn, profile=None, name="executor"):
+    if profile is None:
+        return await loop.run_in_executor(executor, fn)
+    profile.pause()
+    try:
+        with profile.stage(name):
+            return await loop.run_in_executor(executor, profile.run, fn)
+    finally:
+        profile.resume()
+
+
+def prune():
+    # Ring buffer: keep only the newest PROFILE_KEEP profiles
+    with _write_lock:
+        names = sorted({os.path.splitext(f)[0] for f in os.listdir(PROFILE_DIR) if f.endswith(".prof")})
+        for base in names[:-PROFILE_KEEP] if PROFILE_KEEP > 0 else names:
+            for ext in (".prof", ".json"):
+                try:
+                    os.remove(os.path.join(PROFILE_DIR, base + ext))
+                except FileNotFoundError:
+                    pass
+
+
+def list_profiles():
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    profiles = []
+    for f in sorted(os.listdir(PROFILE_DIR), reverse=True):
+        if not f.endswith(".json"):
+            continue
+        with open(os.path.join(PROFILE_DIR, f)) as fp:
+            profiles.append({"id": f[:-len(".json")], **json.load(fp)})
+    return profiles
+
+
+def profile_path(profile_id):
+    # Ids come from the URL; refuse anything that is not a plain file name
+    if os.path.basename(profile_id) != profile_id or profile_id.startswith("."):
+        return None
+    path = os.path.join(PROFILE_DIR, profile_id + ".prof")
+    return path if os.path.exists(path) else None
+
+
+def profile_text(path, limit=40):
+    stream = io.StringIO()
+    pstats.Stats(path, stream=stream).sort_stats("cumulative").print_stats(limit)
+    return stream.getvalue()
@@ -0,0 +1,128 @@
+# app/registry.py
+#
+# Versioned model weights on disk:
+#
+#   models/registry/<version>/weights.pt
+#   models/registry/<version>/meta.json     {"version", "created_at", "notes", ...}
+#   models/registry/active.json             {"active": "<version>", "history": [...]}
+#
+# active.json is the source of truth shared by every worker process; it is
+# replaced atomically, and old versions are never deleted so rollback is just
+# activating an earlier entry in the history.
+
+import json
+import os
+import re
+import shutil
+from datetime import datetime
+
+REGISTRY_DIR = os.getenv("MODEL_REGISTRY_DIR", "models/registry")
+ACTIVE_FILE = "active.json"
+WEIGHTS_FILE = "weights.pt"
+VERSION_PATTERN = re.compile(r"^[A-Za-z0-9._-]+$")
+
+
+class UnknownVersion(LookupError):
+    pass
+
+
+def _active_path():
+    return os.path.join(REGISTRY_DIR, ACTIVE_FILE)
+
+
+def _write_json(path, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def weights_path(version):
+    if not VERSION_PATTERN.match(version or ""):
+        raise UnknownVersion(f"Invalid model version: {version!r}")
+    path = os.path.join(REGISTRY_DIR, version, WEIGHTS_FILE)
+    if not os.path.exists(path):
+        raise UnknownVersion(f"Model version {version} is not in the registry")
+    return path
+
+
+def read_active():
+    try:
+        with open(_active_path()) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"active": None, "history": []}
+
+
+def active_mtime():
+    try:
+        return os.stat(_active_path()).st_mtime
+    except FileNotFoundError:
+        return None
+
+
+def resolve_active(fallback_path):
+    """(weights path, version) to load: the registry's active version, else the legacy MODEL_PATH."""
+    version = read_active()["active"]
+    if version:
+        return weights_path(version), version
+    return fallback_path, os.getenv("MODEL_VERSION", "legacy")
+
+
+def set_active(version, rollback=False):
+    """Make version the active one and the top of the history.
+
+    history is a stack of activations; rollback=True pops the version being
+    replaced, so repeated rollbacks keep walking back instead of toggling.
+    """
+    weights_path(version)
+    state = read_active()
+    if state["active"] == version:
+        return
+    history = state["history"]
+    if rollback and history and history[-1] == state["active"]:
+        history = history[:-1]
+    state["history"] = [v for v in history if v != version] + [version]
+    state["active"] = version
+    os.makedirs(REGISTRY_DIR, exist_ok=True)
+    _write_json(_active_path(), state)
+
+
+def previous_version():
+    history = read_active()["history"]
+    return history[-2] if len(history) >= 2 else None
+
+
+def list_versions():
+    if not os.path.isdir(REGISTRY_DIR):
+        return []
+    versions = []
+    for name in sorted(os.listdir(REGISTRY_DIR)):
+        meta_path = os.path.join(REGISTRY_DIR, name, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                versions.append(json.load(f))
+    return sorted(versions, key=lambda m: m.get("created_at", ""))
+
+
+def register(source_path, version=None, notes=None, metrics=None):
+    """Copy a weights file into the registry as a new (inactive) version."""
+    version = version or datetime.utcnow().strftime("v%Y%m%d%H%M%S")
+    if not VERSION_PATTERN.match(version):
+        raise ValueError(f"Invalid model version: {version!r}")
+    version_dir = os.path.join(REGISTRY_DIR, version)
+    if os.path.exists(version_dir):
+        raise ValueError(f"Model version {version} already exists")
+
+    os.makedirs(version_dir)
+    shutil.copy2(source_path, os.path.join(version_dir, WEIGHTS_FILE))
+    meta = {
+        "version": version,
+        "created_at": datetime.utcnow().isoformat(),
+        "source": os.path.abspath(source_path),
+        "size_bytes": os.path.getsize(source_path),
+        "notes": notes,
+        "metrics": metrics or {}
+    }
+    _write_json(os.path.join(version_dir, "meta.json"), meta)
+    return meta
@@ -0,0 +1,134 @@
+# app/rollups.py
+
+from collections import OrderedDict
+from datetime import date, datetime
+
+from sqlalchemy import func
+
+import app.database as database
+
+# Two views of the same inspections, both keyed by upload day:
+#   prediction - what the model said at upload time
+#   effective  - the corrected label where one exists, else the prediction
+PREDICTION = "prediction"
+EFFECTIVE = "effective"
+KINDS = (PREDICTION, EFFECTIVE)
+
+
+def _upsert(db, values, count, confidence):
+    table = database.DailyRollup.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table).values(**values, inspection_count=count, confidence_sum=confidence)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["project_id", "day", "kind", "label"],
+            set_={"inspection_count": table.c.inspection_count + count, "confidence_sum": table.c.confidence_sum + confidence}
+        )
+        db.execute(stmt)
+        return
+
+    # Other backends: update-then-insert, fine for a single writer
+    updated = db.execute(
+        table.update().where(*[table.c[k] == v for k, v in values.items()]).values(
+            inspection_count=table.c.inspection_count + count, confidence_sum=table.c.confidence_sum + confidence
+        )
+    )
+    if updated.rowcount == 0:
+        db.execute(table.insert().values(**values, inspection_count=count, confidence_sum=confidence))
+
+
+def bump(db, project_id, day, kind, label, count=1, confidence=0.0):
+    """Add `count` inspections to one rollup bucket, in the caller's transaction."""
+    values = {"project_id": project_id or "default", "day": day, "kind": kind, "label": label}
+    _upsert(db, values, count, confidence)
+
+
+def effective_label(inspection):
+    return inspection.corrected_label if inspection.is_corrected and inspection.corrected_label else inspection.prediction
+
+
+def record_inspection(db, inspection):
+    day = (inspection.uploaded_at or datetime.utcnow()).date()
+    bump(db, inspection.project_id, day, PREDICTION, inspection.prediction, 1, inspection.confidence or 0.0)
+    bump(db, inspection.project_id, day, EFFECTIVE, effective_label(inspection))
+
+
+def record_correction(db, inspection, old_label):
+    """Move an inspection between effective-label buckets after a correction."""
+    new_label = effective_label(inspection)
+    if new_label == old_label:
+        return
+    day = inspection.uploaded_at.date()
+    bump(db, inspection.project_id, day, EFFECTIVE, old_label, -1)
+    bump(db, inspection.project_id, day, EFFECTIVE, new_label, 1)
+
+
+def rebuild(db):
+    """Recompute every rollup from the inspections table (backfill / repair)."""
+    Inspection = database.Inspection
+    db.query(database.DailyRollup).delete(synchronize_session=False)
+
+    day = func.date(Inspection.uploaded_at)
+    rows = db.query(
+        Inspection.project_id, day, Inspection.prediction, Inspection.is_corrected, Inspection.corrected_label,
+        func.count(), func.coalesce(func.sum(Inspection.confidence), 0.0)
+    ).group_by(
+        Inspection.project_id, day, Inspection.prediction, Inspection.is_corrected, Inspection.corrected_label
+    )
+
+    buckets = {}
+    for project_id, row_day, prediction, is_corrected, corrected_label, count, confidence in rows:
+        if isinstance(row_day, str):  # SQLite returns date() as text
+            row_day = date.fromisoformat(row_day)
+        project_id = project_id or "default"
+        effective = corrected_label if is_corrected and corrected_label else prediction
+        for key, conf in (((project_id, row_day, PREDICTION, prediction), confidence),
+                          ((project_id, row_day, EFFECTIVE, effective), 0.0)):
+            total = buckets.setdefault(key, [0, 0.0])
+            total[0] += count
+            total[1] += conf
+
+    db.bulk_insert_mappings(database.DailyRollup, [
+        {"project_id": p, "day": d, "kind": k, "label": l, "inspection_count": c, "confidence_sum": s}
+        for (p, d, k, l), (c, s) in buckets.items()
+    ])
+    return len(buckets)
+
+
+def trends(db, project_id, kind=EFFECTIVE, start=None, end=None, bucket="day"):
+    """Per-period label counts for a project, read from the rollups only."""
+    Rollup = database.DailyRollup
+    query = db.query(Rollup.day, Rollup.label, Rollup.inspection_count, Rollup.confidence_sum).filter(
+        Rollup.project_id == project_id, Rollup.kind == kind
+    )
+    if start is not None:
+        query = query.filter(Rollup.day >= start)
+    if end is not None:
+        query = query.filter(Rollup.day < end)
+
+    periods = OrderedDict()
+    for day, label, count, confidence_sum in query.order_by(Rollup.day):
+        if not count:
+            # Buckets emptied by corrections are left in place rather than deleted
+            continue
+        period = day.strftime("%Y-%m") if bucket == "month" else day.isoformat()
+        entry = periods.setdefault(period, {"period": period, "total": 0, "labels": {}, "confidence_sum": 0.0})
+        entry["total"] += count
+        entry["labels"][label] = entry["labels"].get(label, 0) + count
+        entry["confidence_sum"] += confidence_sum
+
+    result = []
+    for entry in periods.values():
+        total = entry["total"]
+        result.append({
+            "period": entry["period"],
+            "total": total,
+            "labels": entry["labels"],
+            "corrosion_rate": entry["labels"].get("corrosion", 0) / total if total else 0.0,
+            "mean_confidence": entry["confidence_sum"] / total if kind == PREDICTION and total else None
+        })
+    return result
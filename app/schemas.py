@@ -1,8 +1,8 @@
 # app/schemas.py
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
 from datetime import datetime
-from typing import Optional, Dict
+from typing import Optional, Dict, List, Literal
 
 class InspectionCreate(BaseModel):
     image_path: str
@@ -18,6 +18,104 @@ class InspectionResponse(InspectionCreate):
     uploaded_at: datetime
     corrected_label: Optional[str] = None
     is_corrected: bool = False
+    corrected_at: Optional[datetime] = None
+    image_hash: Optional[str] = None
+    duplicate_of: Optional[int] = None
+    captured_at: Optional[datetime] = None
+    camera_make: Optional[str] = None
+    camera_model: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    altitude: Optional[float] = None
+    corrosion_coverage: Optional[float] = None
+    # [{"label", "confidence", "box": [x1, y1, x2, y2]}], box as fractions of the image
+    detections: Optional[List[Dict]] = None
+    model_version: Optional[str] = None
+    source_video: Optional[str] = None
+    video_start_s: Optional[float] = None
+    video_end_s: Optional[float] = None
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class Correction(BaseModel):
+    inspection_id: int
+    # Labels become folder names in the retraining export, so keep them path-safe
+    corrected_label: str = Field(..., min_length=1, max_length=64, pattern=r"^[A-Za-z0-9_\-]+$")
+
+class CorrectionsRequest(BaseModel):
+    corrections: List[Correction] = Field(..., min_length=1)
+
+class CorrectionsResponse(BaseModel):
+    updated: int
+    missing: List[int] = []
+    corrected_at: datetime
+
+class DuplicateGroupsResponse(BaseModel):
+    project_id: str
+    radius: int
+    groups: List[List[int]]
+
+class NearbyInspection(InspectionResponse):
+    distance_m: float
+
+class TrendPoint(BaseModel):
+    period: str
+    total: int
+    labels: Dict[str, int]
+    corrosion_rate: float
+    mean_confidence: Optional[float] = None
+
+class VideoJob(BaseModel):
+    job_id: str
+    status: str
+    filename: str
+    project_id: str
+    submitted_at: datetime
+    finished_at: Optional[datetime] = None
+    fps: Optional[float] = None
+    duration_s: Optional[float] = None
+    frames_read: int = 0
+    frames_sampled: int = 0
+    frames_inferred: int = 0
+    segments: List[int] = []
+    error: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+class AnnotationShape(BaseModel):
+    id: str = Field(..., min_length=1, max_length=64)
+    type: Literal["box", "polygon", "text"]
+    # [x, y] as fractions of the image width / height
+    points: List[List[float]]
+    color: str = Field("#FF0000", pattern=r"^#[0-9A-Fa-f]{6}$")
+    width: int = Field(3, ge=1, le=50)
+    note: Optional[str] = Field(None, max_length=500)
+
+    @model_validator(mode="after")
+    def check_points(self):
+        expected = {"box": (2, 2), "polygon": (3, 500), "text": (1, 1)}[self.type]
+        if not expected[0] <= len(self.points) <= expected[1]:
+            raise ValueError(f"A {self.type} needs {expected[0]}-{expected[1]} points")
+        if any(len(p) != 2 or not all(0 <= v <= 1 for v in p) for p in self.points):
+            raise ValueError("Points must be [x, y] pairs between 0 and 1")
+        if self.type == "text" and not self.note:
+            raise ValueError("A text shape needs a note")
+        return self
+
+class LayerDelta(BaseModel):
+    base_version: int = Field(..., ge=0)
+    add: List[AnnotationShape] = []
+    update: List[AnnotationShape] = []
+    remove: List[str] = []
+
+class AnnotationLayerResponse(BaseModel):
+    inspection_id: int
+    name: str
+    version: int
+    shapes: List[Dict]
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
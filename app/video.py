@@ -0,0 +1,189 @@
+# app/video.py
+#
+# Offline ingestion of drone / crawler videos. The file is decoded one frame
+# at a time and only a handful of frames are ever held in memory (one
+# inference batch plus the best frame of the open segment), so memory does not
+# grow with the length of the video.
+#
+#   sampling:  at most VIDEO_MAX_FPS frames per second of video are looked at,
+#              and a frame that is nearly identical to the last one sent to the
+#              model is skipped (it inherits that frame's result); a frame is
+#              forced through every VIDEO_MAX_GAP_S so nothing is missed
+#   merging:   consecutive corrosion frames less than VIDEO_MERGE_GAP_S apart
+#              form one segment, stored as a single Inspection (its best frame,
+#              plus video_start_s / video_end_s)
+
+import os
+import time
+from uuid import uuid4
+
+from PIL import Image
+
+import app.inspections as inspections
+
+VIDEO_MAX_FPS = float(os.getenv("VIDEO_MAX_FPS", 2))
+VIDEO_DIFF_THRESHOLD = float(os.getenv("VIDEO_DIFF_THRESHOLD", 6))
+VIDEO_MAX_GAP_S = float(os.getenv("VIDEO_MAX_GAP_S", 10))
+VIDEO_MERGE_GAP_S = float(os.getenv("VIDEO_MERGE_GAP_S", 3))
+VIDEO_BATCH_SIZE = int(os.getenv("VIDEO_BATCH_SIZE", 8))
+# Frames are shrunk before batching; the model only sees ~640px anyway
+VIDEO_MAX_SIDE = int(os.getenv("VIDEO_MAX_SIDE", 1280))
+
+THUMB_SIZE = (32, 18)
+
+
+def _thumbnail(frame, cv2):
+    return cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), THUMB_SIZE, interpolation=cv2.INTER_AREA).astype("float32")
+
+
+def sample_frames(path, max_fps=VIDEO_MAX_FPS, diff_threshold=VIDEO_DIFF_THRESHOLD, max_gap_s=VIDEO_MAX_GAP_S, stats=None):
+    """Yield (seconds, image) for frames worth running through the model.
+
+    image is None for a sampled frame that is nearly identical to the last
+    yielded one; it is still yielded so segments can be extended over it.
+    stats is filled in with frame counts as the video is read.
+    """
+    # OpenCV is only needed here, and costs a noticeable import
+    import cv2
+
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ValueError(f"Could not open video {path}")
+    fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+    step = max(1, int(round(fps / max_fps))) if max_fps > 0 else 1
+    stats = stats if stats is not None else {}
+    stats.update(fps=fps, frames_read=0, frames_sampled=0, frames_inferred=0)
+
+    last_thumb, last_t = None, None
+    index = -1
+    try:
+        while True:
+            # grab() advances without converting the frame; only sampled frames are retrieved
+            if not capture.grab():
+                break
+            index += 1
+            stats["frames_read"] += 1
+            if index % step:
+                continue
+            ok, frame = capture.retrieve()
+            if not ok:
+                break
+            t = index / fps
+            stats["frames_sampled"] += 1
+
+            thumb = _thumbnail(frame, cv2)
+            if last_thumb is not None and t - last_t < max_gap_s \
+                    and float(abs(thumb - last_thumb).mean()) < diff_threshold:
+                yield t, None
+                continue
+            last_thumb, last_t = thumb, t
+
+            height, width = frame.shape[:2]
+            scale = VIDEO_MAX_SIDE / max(height, width)
+            if scale < 1:
+                frame = cv2.resize(frame, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+            stats["frames_inferred"] += 1
+            yield t, Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    finally:
+        capture.release()
+        stats["duration_s"] = (index + 1) / fps
+
+
+def batched(samples, size):
+    """Group samples so each group holds at most `size` frames that need inference."""
+    group, frames = [], 0
+    for t, image in samples:
+        group.append((t, image))
+        if image is not None:
+            frames += 1
+            if frames >= size:
+                yield group
+                group, frames = [], 0
+    if group:
+        yield group
+
+
+class Segment:
+    """A run of consecutive corrosion frames; only the most confident frame is kept."""
+
+    def __init__(self, t, image, result):
+        self.start_s = self.end_s = t
+        self.frames = 0
+        self.max_coverage = 0.0
+        self.best_t, self.best_image, self.best = t, image, result
+        self.add(t, image, result)
+
+    def add(self, t, image, result):
+        self.end_s = t
+        self.frames += 1
+        self.max_coverage = max(self.max_coverage, result.get("coverage") or 0.0)
+        if result["confidence"] > self.best["confidence"]:
+            self.best_t, self.best_image, self.best = t, image, result
+
+
+def save_segment(db, segment, source_video, project_id, project_description):
+    image = segment.best_image
+    inspection = inspections.build_inspection(
+        db, segment.best, inspections.describe(db, image, project_id),
+        f"{uuid4()}_{os.path.splitext(source_video)[0]}_{segment.best_t:.1f}s.jpg", image,
+        image_metadata={
+            "filename": source_video,
+            "content_type": "video",
+            "frame_s": segment.best_t,
+            "segment_frames": segment.frames,
+            "max_coverage": segment.max_coverage
+        },
+        project_id=project_id,
+        project_description=project_description,
+        source_video=source_video,
+        video_start_s=segment.start_s,
+        video_end_s=segment.end_s
+    )
+    db.commit()
+    return inspection.id
+
+
+def ingest(path, db, infer, project_id="default", project_description=None, source_video=None,
+           batch_size=VIDEO_BATCH_SIZE, merge_gap_s=VIDEO_MERGE_GAP_S, progress=None, **sampling):
+    """Run a video through `infer` (a list of images -> list of results) and store its corrosion segments.
+
+    Each segment is committed as soon as it closes, so a long video that fails
+    half way keeps what was found so far. progress, if given, is called with
+    the running stats after every batch.
+    """
+    source_video = source_video or os.path.basename(path)
+    stats = {"segments": []}
+    started = time.perf_counter()
+    segment = None
+    previous = (None, None)
+
+    def close():
+        nonlocal segment
+        if segment is not None:
+            stats["segments"].append(save_segment(db, segment, source_video, project_id, project_description))
+            segment = None
+
+    for group in batched(sample_frames(path, stats=stats, **sampling), batch_size):
+        images = [image for _, image in group if image is not None]
+        results = iter(infer(images) if images else [])
+        for t, image in group:
+            # Skipped near-identical frames carry the last inferred frame and result forward
+            if image is not None:
+                previous = (image, next(results))
+            image, result = previous
+            if result is None:
+                continue
+            if segment is not None and t - segment.end_s > merge_gap_s:
+                close()
+            if result["label"] != "corrosion":
+                continue
+            if segment is None:
+                segment = Segment(t, image, result)
+            else:
+                segment.add(t, image, result)
+        if progress is not None:
+            progress(stats)
+    close()
+
+    stats["elapsed_s"] = time.perf_counter() - started
+    return stats
@@ -0,0 +1,67 @@
+# backfill_boxes.py
+#
+# Convert detection boxes stored before they were normalised: those were in
+# pixels of the decoded (usually downscaled) image, which is re-derived here by
+# decoding the archived upload the same way /upload does. Safe to re-run: a
+# pixel box always has a coordinate above 1, a normalised one never does.
+
+import os
+
+from PIL import Image
+from sqlalchemy.orm.attributes import flag_modified
+
+import app.database as database
+import app.imaging as imaging
+
+BATCH_SIZE = 200
+
+
+def in_pixels(detections):
+    return any(v > 1.0 for d in detections for v in d["box"])
+
+
+database.Base.metadata.create_all(bind=database.engine)
+database.add_missing_columns()
+
+db = database.SessionLocal()
+converted, missing, last_id = 0, 0, 0
+try:
+    while True:
+        batch = db.query(database.Inspection).filter(
+            database.Inspection.detections.isnot(None),
+            database.Inspection.id > last_id
+        ).order_by(database.Inspection.id).limit(BATCH_SIZE).all()
+        if not batch:
+            break
+
+        for inspection in batch:
+            last_id = inspection.id
+            if not inspection.detections or not in_pixels(inspection.detections):
+                continue
+            path = os.path.join("uploads", inspection.image_path.split("/")[-1])
+            try:
+                with open(path, "rb") as f:
+                    # Video frames were stored at the size they were inferred at, and
+                    # only JPEG uploads used to be decoded below full resolution
+                    full_resolution = inspection.source_video is not None or Image.open(f).format != "JPEG"
+                    f.seek(0)
+                    image = imaging.decode_image(f, full_resolution=full_resolution)
+                width, height = image.size
+            except Exception:
+                missing += 1
+                continue
+            inspection.detections = [
+                {**d, "box": [round(x1 / width, 5), round(y1 / height, 5), round(x2 / width, 5), round(y2 / height, 5)]}
+                for d in inspection.detections
+                for x1, y1, x2, y2 in [d["box"]]
+            ]
+            flag_modified(inspection, "detections")
+            converted += 1
+
+        db.commit()
+finally:
+    db.close()
+
+print(f"✅ Normalised boxes on {converted} inspections")
+if missing:
+    print(f"⚠️  {missing} images could not be read from uploads/")
@@ -0,0 +1,50 @@
+# backfill_hashes.py
+#
+# Compute perceptual hashes and mean colours for inspections uploaded before
+# near-duplicate detection (or its colour check) existed. Safe to re-run: only
+# rows missing either are touched.
+
+import os
+
+from sqlalchemy import or_
+
+import app.database as database
+import app.dedup as dedup
+import app.imaging as imaging
+
+BATCH_SIZE = 200
+
+database.Base.metadata.create_all(bind=database.engine)
+database.add_missing_columns()
+
+db = database.SessionLocal()
+hashed, missing, last_id = 0, 0, 0
+try:
+    while True:
+        batch = db.query(database.Inspection).filter(
+            or_(database.Inspection.image_hash.is_(None), database.Inspection.mean_color.is_(None)),
+            database.Inspection.id > last_id
+        ).order_by(database.Inspection.id).limit(BATCH_SIZE).all()
+        if not batch:
+            break
+
+        for inspection in batch:
+            last_id = inspection.id
+            path = os.path.join("uploads", inspection.image_path.split("/")[-1])
+            try:
+                with open(path, "rb") as f:
+                    image = imaging.decode_image(f)
+            except Exception:
+                missing += 1
+                continue
+            for column, v in dedup.hash_columns(dedup.dhash(image), dedup.mean_color(image)).items():
+                setattr(inspection, column, v)
+            hashed += 1
+
+        db.commit()
+finally:
+    db.close()
+
+print(f"✅ Hashed {hashed} inspections")
+if missing:
+    print(f"⚠️  {missing} images could not be read from uploads/")
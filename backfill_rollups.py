@@ -0,0 +1,21 @@
+# backfill_rollups.py
+#
+# Rebuild the daily_rollups table from the inspections table. Run once after
+# deploying rollups, or any time the rollups are suspected to have drifted.
+
+import app.database as database
+import app.rollups as rollups
+
+database.Base.metadata.create_all(bind=database.engine)
+
+db = database.SessionLocal()
+try:
+    buckets = rollups.rebuild(db)
+    db.commit()
+except Exception:
+    db.rollback()
+    raise
+finally:
+    db.close()
+
+print(f"✅ Rebuilt {buckets} rollup buckets")
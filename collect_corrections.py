@@ -1,25 +1,121 @@
 # collect_corrections.py
+#
+# Incrementally export corrected inspections for retraining.
+#
+# Only corrections made since the last run are pulled (tracked by a watermark
+# stored next to the label folders, so each layout has its own), and images are
+# hardlinked rather than copied, so each run costs O(new corrections) instead
+# of O(table size). corrected_at is stamped before the correction commits, so a
+# slow commit can land behind the watermark; each run therefore re-scans
+# LOOKBACK_S before it. Re-linking an image that is already in place is a no-op.
+#
+#   python collect_corrections.py                      # ImageFolder: retraining_data/<label>/
+#   python collect_corrections.py --layout yolo        # YOLO classify: retraining_data/train/<label>/
+#   python collect_corrections.py --full               # ignore the watermark and re-export everything
 
-import sqlite3
-import shutil
+import argparse
+import json
 import os
+import shutil
+from datetime import datetime, timedelta
+
+import app.database as database
+
+UPLOADS_DIR = "uploads"
+STATE_FILE = ".export_state.json"
+LOOKBACK_S = 300
+
+
+def load_watermark(root):
+    path = os.path.join(root, STATE_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        state = json.load(f)
+    return datetime.fromisoformat(state["corrected_at"])
+
+
+def save_watermark(root, corrected_at):
+    path = os.path.join(root, STATE_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"corrected_at": corrected_at.isoformat()}, f)
+    os.replace(tmp_path, path)
+
+
+def label_root(out_dir, layout):
+    # Ultralytics classification datasets are ImageFolder trees under train/
+    return os.path.join(out_dir, "train") if layout == "yolo" else out_dir
+
+
+def link_image(src, dst):
+    """Link src to dst; False if it was already there."""
+    if os.path.exists(dst):
+        if os.path.samefile(src, dst):
+            return False
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        # Hardlinks fail across filesystems; fall back to a plain copy
+        shutil.copy2(src, dst)
+    return True
+
+
+def export_corrections(db, out_dir="retraining_data", layout="imagefolder", full=False, lookback_s=LOOKBACK_S):
+    root = label_root(out_dir, layout)
+    os.makedirs(root, exist_ok=True)
+
+    Inspection = database.Inspection
+    query = db.query(Inspection.id, Inspection.image_path, Inspection.corrected_label, Inspection.corrected_at).filter(
+        Inspection.is_corrected.is_(True),
+        Inspection.corrected_at.isnot(None)
+    )
+
+    watermark = None if full else load_watermark(root)
+    if watermark is not None:
+        query = query.filter(Inspection.corrected_at >= watermark - timedelta(seconds=lookback_s))
+
+    exported, skipped = 0, 0
+    for inspection_id, image_path, label, corrected_at in query.order_by(Inspection.corrected_at, Inspection.id).yield_per(500):
+        filename = image_path.split("/")[-1]
+        src = os.path.join(UPLOADS_DIR, filename)
+        if not os.path.exists(src):
+            skipped += 1
+        else:
+            # A re-correction moves the image, so drop it from any other label folder
+            for other in os.listdir(root):
+                stale = os.path.join(root, other, filename)
+                if other != label and os.path.exists(stale):
+                    os.remove(stale)
+
+            os.makedirs(os.path.join(root, label), exist_ok=True)
+            if link_image(src, os.path.join(root, label, filename)):
+                exported += 1
+
+        watermark = max(watermark, corrected_at) if watermark is not None else corrected_at
+
+    if watermark is not None:
+        save_watermark(root, watermark)
 
-conn = sqlite3.connect("data.db")
-cursor = conn.cursor()
+    return exported, skipped
 
-cursor.execute("""
-    SELECT image_path FROM inspections 
-    WHERE corrected_label = 'corrosion'
-""")
 
-os.makedirs("retraining_data/corrosion", exist_ok=True)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export corrected inspections for retraining")
+    parser.add_argument("--out", default="retraining_data", help="Output dataset folder")
+    parser.add_argument("--layout", choices=["imagefolder", "yolo"], default="imagefolder")
+    parser.add_argument("--full", action="store_true", help="Ignore the watermark and export every correction")
+    parser.add_argument("--lookback", type=float, default=LOOKBACK_S,
+                        help="Seconds behind the watermark to re-scan for corrections that committed late")
+    args = parser.parse_args()
 
-for row in cursor.fetchall():
-    filename = row[0].split("/")[-1]
-    src = os.path.join("uploads", filename)
-    dst = os.path.join("retraining_data/corrosion", filename)
-    if os.path.exists(src):
-        shutil.copy(src, dst)
+    db = database.SessionLocal()
+    try:
+        exported, skipped = export_corrections(db, args.out, args.layout, args.full, args.lookback)
+    finally:
+        db.close()
 
-conn.close()
-print(f"✅ Collected {cursor.rowcount} corrected corrosion images for retraining")
\ No newline at end of file
+    print(f"✅ Exported {exported} new corrections to {label_root(args.out, args.layout)}")
+    if skipped:
+        print(f"⚠️  {skipped} corrected images were missing from {UPLOADS_DIR}/")
@@ -0,0 +1,50 @@
+# ingest_video.py
+#
+# Run a drone / crawler video through the model and store one inspection per
+# corrosion segment, without going through the API. Uses the same sampling and
+# merging as POST /videos (see app/video.py).
+#
+#   python ingest_video.py pipeline_run.mp4 --project line-7
+#   python ingest_video.py crawler.mov --project tank-2 --max-fps 4 --merge-gap 5
+#   STUB_MODEL=1 python ingest_video.py sample.mp4          # no weights needed
+
+import argparse
+
+import app.database as database
+import app.model as model
+import app.video as video
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest a video into the corrosion inspection database")
+    parser.add_argument("path")
+    parser.add_argument("--project", default="default")
+    parser.add_argument("--description")
+    parser.add_argument("--max-fps", type=float, default=video.VIDEO_MAX_FPS, help="Frames looked at per second of video")
+    parser.add_argument("--diff-threshold", type=float, default=video.VIDEO_DIFF_THRESHOLD,
+                        help="Mean grey-level change below which a frame counts as unchanged")
+    parser.add_argument("--max-gap", type=float, default=video.VIDEO_MAX_GAP_S, help="Force a frame through at least this often (s)")
+    parser.add_argument("--merge-gap", type=float, default=video.VIDEO_MERGE_GAP_S, help="Join detections this close together (s)")
+    parser.add_argument("--batch-size", type=int, default=video.VIDEO_BATCH_SIZE)
+    args = parser.parse_args()
+
+    database.Base.metadata.create_all(bind=database.engine)
+    database.add_missing_columns()
+
+    def progress(stats):
+        print(f"\r🎞️  {stats['frames_read']} frames read, {stats['frames_inferred']} inferred, "
+              f"{len(stats['segments'])} segments", end="", flush=True)
+
+    db = database.SessionLocal()
+    try:
+        stats = video.ingest(args.path, db, model.predict_batch, project_id=args.project,
+                             project_description=args.description, batch_size=args.batch_size,
+                             merge_gap_s=args.merge_gap, progress=progress, max_fps=args.max_fps,
+                             diff_threshold=args.diff_threshold, max_gap_s=args.max_gap)
+    finally:
+        db.close()
+    print()
+
+    realtime = stats["duration_s"] / stats["elapsed_s"] if stats["elapsed_s"] else 0
+    print(f"✅ {stats['duration_s']:.0f}s of video ({stats['fps']:.1f} fps) in {stats['elapsed_s']:.1f}s ({realtime:.1f}x realtime)")
+    print(f"   sampled {stats['frames_sampled']} of {stats['frames_read']} frames, ran the model on {stats['frames_inferred']}")
+    print(f"   stored {len(stats['segments'])} corrosion segments: {stats['segments']}")
@@ -0,0 +1,213 @@
+# live_client.py
+#
+# Test client for the live inspection WebSocket (/ws/live, see app/live.py).
+# Streams JPEG frames at a fixed rate and reports end-to-end latency: from just
+# before a frame is sent to its result arriving back. By default it starts a
+# stub-model server the same way loadtest.py does.
+#
+#   python live_client.py --fps 15 --duration 20
+#   python live_client.py --source inspection.mp4 --size 1280x720
+#   python live_client.py --source 0 --url ws://localhost:8000/ws/live   # webcam, existing server
+#   python live_client.py --mark-every 50                                # also save every 50th result
+#   python live_client.py --background-uploads 4                         # with /upload traffic alongside
+#
+# Frames the server replaced with a newer one (latest frame wins) never get a
+# result; they are reported as dropped rather than counted in the latency.
+
+import argparse
+import json
+import random
+import threading
+import time
+from argparse import Namespace
+
+import requests
+from websockets.sync.client import connect
+
+import app.live as live
+from loadtest import Server, make_image, percentile
+
+
+def synthetic_frames(size):
+    # A short loop of rusty and clean frames, encoded once up front
+    frames = [make_image(size, rusty=i % 4 < 2) for i in range(16)]
+    while True:
+        yield from frames
+
+
+def video_frames(source, size, quality):
+    import cv2
+
+    capture = cv2.VideoCapture(int(source) if source.isdigit() else source)
+    if not capture.isOpened():
+        raise SystemExit(f"Could not open {source}")
+    try:
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                if source.isdigit():
+                    raise SystemExit("Camera stopped delivering frames")
+                capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                continue
+            frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+            yield cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])[1].tobytes()
+    finally:
+        capture.release()
+
+
+def background_uploads(base_url, clients, stop, counts):
+    # Photo uploads competing with the live stream for the server, as in the field
+    images = [make_image((4000, 3000), rusty=i % 2 == 0) for i in range(2)]
+
+    def client():
+        session = requests.Session()
+        while not stop.is_set():
+            try:
+                status = session.post(base_url + "/upload", files={"file": ("bg.jpg", random.choice(images), "image/jpeg")},
+                                      data={"project_id": "live-bg"}, timeout=60).status_code
+            except requests.RequestException as e:
+                status = type(e).__name__
+            counts[status] = counts.get(status, 0) + 1
+
+    threads = [threading.Thread(target=client, daemon=True) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+class LiveRun:
+    def __init__(self, ws, args):
+        self.ws = ws
+        self.args = args
+        self.sent_at = {}
+        self.latencies = []
+        self.server_ms = {"decode": [], "infer": []}
+        self.results = 0
+        self.corrosion = 0
+        self.saved = []
+        self.errors = []
+        self.server_dropped = 0
+        self.lock = threading.Lock()
+
+    def receive(self):
+        for message in self.ws:
+            received_at = time.perf_counter()
+            body = json.loads(message)
+            kind = body.get("type")
+            if kind == "saved":
+                self.saved.append(body["inspection_id"])
+            elif kind == "error":
+                self.errors.append(body["detail"])
+            else:
+                with self.lock:
+                    sent_at = self.sent_at.pop(body["id"], None)
+                if sent_at is not None:
+                    self.latencies.append((received_at - sent_at) * 1000)
+                for name in self.server_ms:
+                    self.server_ms[name].append(body["ms"][name])
+                self.results += 1
+                self.server_dropped = body["dropped"]
+                if body["label"] == "corrosion":
+                    self.corrosion += 1
+                    if self.args.mark_every and self.corrosion % self.args.mark_every == 0:
+                        self.ws.send(json.dumps({"type": "finding", "id": body["id"]}))
+
+    def send(self, frames):
+        interval = 1 / self.args.fps
+        deadline = time.perf_counter() + self.args.duration
+        next_at = time.perf_counter()
+        frame_id = 0
+        for data in frames:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            if next_at > now:
+                time.sleep(next_at - now)
+            next_at += interval
+            frame_id += 1
+            with self.lock:
+                self.sent_at[frame_id] = time.perf_counter()
+            self.ws.send(live.pack_frame(frame_id, data))
+        return frame_id
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure end-to-end latency of the live inspection WebSocket")
+    parser.add_argument("--url", help="ws:// URL of a running server instead of spawning a stub one")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--stub-latency-ms", type=float, default=30)
+    parser.add_argument("--source", default="synthetic", help="synthetic, a video file, or a camera index")
+    parser.add_argument("--size", default="1280x720")
+    parser.add_argument("--quality", type=int, default=80, help="JPEG quality for video/camera frames")
+    parser.add_argument("--fps", type=float, default=15)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--project", default="default")
+    parser.add_argument("--mark-every", type=int, default=0, help="Mark every Nth corrosion result as a finding")
+    parser.add_argument("--background-uploads", type=int, default=0, help="Clients posting 12 MP /upload requests meanwhile")
+    parser.add_argument("--json", help="Write the report to this file")
+    args = parser.parse_args()
+
+    size = tuple(int(v) for v in args.size.split("x"))
+    frames = synthetic_frames(size) if args.source == "synthetic" else video_frames(args.source, size, args.quality)
+
+    server = None
+    if args.url:
+        url = args.url
+    else:
+        server = Server(Namespace(port=args.port, stub_latency_ms=args.stub_latency_ms, inference_workers=1,
+                                  max_inflight=0, workers=1, server_output=False))
+        url = server.url.replace("http://", "ws://") + "/ws/live"
+        print(f"🚀 Started stub server (stub latency {args.stub_latency_ms:.0f} ms)")
+
+    stop_uploads = threading.Event()
+    upload_counts = {}
+    try:
+        if args.background_uploads:
+            http_url = url.replace("ws://", "http://").replace("wss://", "https://").rsplit("/ws/", 1)[0]
+            background_uploads(http_url, args.background_uploads, stop_uploads, upload_counts)
+            time.sleep(1)
+        with connect(f"{url}?project_id={args.project}", max_size=None) as ws:
+            run = LiveRun(ws, args)
+            receiver = threading.Thread(target=run.receive, daemon=True)
+            receiver.start()
+            started = time.perf_counter()
+            sent = run.send(frames)
+            # Give the last results (and any saves) a moment to come back
+            time.sleep(1 + args.stub_latency_ms / 1000)
+            elapsed = time.perf_counter() - started
+    finally:
+        stop_uploads.set()
+        if server:
+            server.stop()
+
+    report = {
+        "sent": sent,
+        "results": run.results,
+        "dropped": sent - run.results,
+        "server_dropped": run.server_dropped,
+        "result_fps": run.results / elapsed,
+        "latency_ms": {f"p{p}": percentile(run.latencies, p) for p in (50, 90, 99)},
+        "server_ms": {name: percentile(values, 50) for name, values in run.server_ms.items()},
+        "saved": run.saved,
+        "errors": run.errors,
+        "background_uploads": {str(s): n for s, n in upload_counts.items()}
+    }
+    report["latency_ms"]["max"] = max(run.latencies) if run.latencies else 0.0
+
+    print(f"📡 {sent} frames sent at {args.fps:g} fps, {run.results} results ({report['result_fps']:.1f}/s), "
+          f"{report['dropped']} dropped")
+    latency = report["latency_ms"]
+    print(f"⏱️  end-to-end p50 {latency['p50']:.0f} ms, p90 {latency['p90']:.0f} ms, p99 {latency['p99']:.0f} ms, "
+          f"max {latency['max']:.0f} ms")
+    print(f"   server median: decode {report['server_ms']['decode']:.1f} ms, inference {report['server_ms']['infer']:.1f} ms")
+    if upload_counts:
+        print(f"📤 Background uploads meanwhile: {report['background_uploads']}")
+    if run.saved:
+        print(f"💾 Saved findings as inspections {run.saved}")
+    if run.errors:
+        print(f"⚠️  {len(run.errors)} errors, first: {run.errors[0]}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"📄 Report written to {args.json}")
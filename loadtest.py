@@ -0,0 +1,352 @@
+# loadtest.py
+#
+# Load generator for capacity planning. By default it starts its own server:
+# uvicorn app.main:app on a throwaway SQLite database with the stub model
+# (STUB_MODEL=1), so no weights or Postgres are needed.
+#
+#   python loadtest.py --rate 5 --duration 60
+#   python loadtest.py --ramp 1,2,4,8,16 --stage-seconds 30 --inference-workers 2
+#   python loadtest.py --url http://localhost:8000 --concurrency 32   # existing server
+#
+# --rate is an open-loop Poisson arrival rate (requests/s): every arrival gets
+# its own thread, however many are already outstanding, and its latency is
+# measured from its scheduled arrival time, so a saturated server shows up as
+# growing latency, 503s and a backlog rather than as a slower client. Arrivals
+# stop at the end of the stage; requests still outstanding then are reported
+# as the backlog and given --timeout to drain. With --rate 0 each of the
+# --concurrency clients sends back-to-back (closed loop). The report has
+# throughput, latency percentiles and errors per endpoint, plus server RSS
+# sampled once a second (only when the server was spawned here).
+
+import argparse
+import io
+import json
+import os
+import random
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from PIL import Image
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def parse_weights(spec):
+    weights = {}
+    for part in spec.split(","):
+        key, _, weight = part.partition("=")
+        weights[key.strip()] = float(weight or 1)
+    return weights
+
+
+def make_image(size, rusty):
+    # Smooth colour field: compresses like a photo and gives the stub model both classes
+    width, height = size
+    colour = (150, 80, 40) if rusty else (120, 125, 130)
+    image = Image.new("RGB", (width, height), colour)
+    noise = Image.effect_noise((width // 8 or 1, height // 8 or 1), 30).resize((width, height)).convert("RGB")
+    image = Image.blend(image, noise, 0.25)
+    buf = io.BytesIO()
+    image.save(buf, "JPEG", quality=88)
+    return buf.getvalue()
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def process_tree_rss_mb(pid):
+    """Resident memory of pid plus its children (uvicorn --workers forks), Linux only."""
+    children = defaultdict(list)
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            children[ppid].append(int(entry))
+        except (OSError, IndexError, ValueError):
+            continue
+
+    total, stack = 0, [pid]
+    while stack:
+        current = stack.pop()
+        stack.extend(children.get(current, []))
+        try:
+            with open(f"/proc/{current}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1])
+        except OSError:
+            pass
+    return total / 1024
+
+
+class Server:
+    def __init__(self, args):
+        self.workdir = tempfile.mkdtemp(prefix="corrosion-load-")
+        self.url = f"http://127.0.0.1:{args.port}"
+        env = dict(os.environ)
+        env.update({
+            "DATABASE_URL": f"sqlite:///{os.path.join(self.workdir, 'load.db')}",
+            "STUB_MODEL": "1",
+            "STUB_LATENCY_MS": str(args.stub_latency_ms),
+            "INFERENCE_WORKERS": str(args.inference_workers),
+            "PYTHONPATH": REPO_DIR + os.pathsep + env.get("PYTHONPATH", "")
+        })
+        if args.max_inflight:
+            env["MAX_INFLIGHT_UPLOADS"] = str(args.max_inflight)
+        cmd = [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+               "--port", str(args.port), "--workers", str(args.workers), "--log-level", "warning"]
+        output = None if args.server_output else subprocess.DEVNULL
+        self.process = subprocess.Popen(cmd, cwd=self.workdir, env=env, stdout=output, stderr=output)
+
+        deadline = time.time() + 60
+        while time.time() < deadline:
+            try:
+                if requests.get(self.url + "/", timeout=1).ok:
+                    return
+            except requests.RequestException:
+                pass
+            if self.process.poll() is not None:
+                raise RuntimeError("Server exited during startup")
+            time.sleep(0.2)
+        self.stop()
+        raise RuntimeError("Server did not become ready within 60s")
+
+    def rss_mb(self):
+        return process_tree_rss_mb(self.process.pid)
+
+    def stop(self):
+        if self.process.poll() is None:
+            self.process.send_signal(signal.SIGINT)
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+class LoadRun:
+    def __init__(self, url, args, images):
+        self.url = url
+        self.args = args
+        self.images = images
+        self.mix = parse_weights(args.mix)
+        self.sizes = parse_weights(args.sizes)
+        self.session = requests.Session()
+        # Open loop can have far more requests outstanding than --concurrency; size the pool for that
+        pool_size = args.concurrency if args.rate <= 0 and not args.ramp else max(args.concurrency, 1024)
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.static_paths = []
+        self.outstanding = 0
+        self.backlog = 0
+        self.drain_s = 0.0
+
+    def pick(self, weights):
+        return random.choices(list(weights), weights=list(weights.values()))[0]
+
+    def one_request(self, scheduled_at=None):
+        kind = self.pick(self.mix)
+        start = scheduled_at if scheduled_at is not None else time.perf_counter()
+        try:
+            if kind == "upload":
+                size = self.pick(self.sizes)
+                data = random.choice(self.images[size])
+                response = self.session.post(self.url + "/upload", files={"file": (f"load_{size}.jpg", data, "image/jpeg")},
+                                             data={"project_id": "loadtest"}, timeout=self.args.timeout)
+                if response.ok:
+                    body = response.json()
+                    with self.lock:
+                        self.static_paths.append(body["annotated_path"])
+                        self.static_paths.append(body["image_path"])
+            elif kind == "list":
+                response = self.session.get(self.url + "/inspections", timeout=self.args.timeout)
+            elif kind == "export":
+                response = self.session.get(self.url + "/inspections/export", timeout=self.args.timeout)
+            elif kind == "static":
+                with self.lock:
+                    path = random.choice(self.static_paths) if self.static_paths else None
+                if path is None:
+                    return
+                response = self.session.get(self.url + path, timeout=self.args.timeout)
+            else:
+                raise ValueError(f"Unknown request kind: {kind}")
+            status = response.status_code
+        except requests.RequestException as e:
+            status = type(e).__name__
+        elapsed = (time.perf_counter() - start) * 1000
+
+        with self.lock:
+            self.latencies[kind].append(elapsed)
+            self.statuses[kind][status] += 1
+
+    def arrival(self, scheduled_at):
+        try:
+            self.one_request(scheduled_at)
+        finally:
+            with self.lock:
+                self.outstanding -= 1
+
+    def run(self, rate, duration):
+        if rate > 0:
+            self.run_open_loop(rate, duration)
+            return
+        deadline = time.perf_counter() + duration
+        with ThreadPoolExecutor(max_workers=self.args.concurrency) as pool:
+            def client():
+                while time.perf_counter() < deadline:
+                    self.one_request()
+            for _ in range(self.args.concurrency):
+                pool.submit(client)
+
+    def run_open_loop(self, rate, duration):
+        # Arrivals never wait for earlier responses or for a free client thread
+        started = time.perf_counter()
+        deadline = started + duration
+        threads = []
+        next_at = started + random.expovariate(rate)
+        while next_at < deadline:
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            with self.lock:
+                self.outstanding += 1
+            thread = threading.Thread(target=self.arrival, args=(next_at,), daemon=True)
+            thread.start()
+            threads.append(thread)
+            next_at += random.expovariate(rate)
+
+        remaining = deadline - time.perf_counter()
+        if remaining > 0:
+            time.sleep(remaining)
+        with self.lock:
+            self.backlog = self.outstanding
+        drain_deadline = time.perf_counter() + self.args.timeout
+        for thread in threads:
+            thread.join(max(0.0, drain_deadline - time.perf_counter()))
+        self.drain_s = time.perf_counter() - deadline
+
+    def report(self, elapsed):
+        rows = {}
+        for kind in sorted(self.latencies):
+            latencies = self.latencies[kind]
+            statuses = dict(self.statuses[kind])
+            ok = sum(n for s, n in statuses.items() if isinstance(s, int) and s < 400)
+            rows[kind] = {
+                "requests": len(latencies),
+                "throughput_rps": ok / elapsed,
+                "error_rate": 1 - ok / len(latencies) if latencies else 0.0,
+                "p50_ms": percentile(latencies, 50),
+                "p90_ms": percentile(latencies, 90),
+                "p99_ms": percentile(latencies, 99),
+                "max_ms": max(latencies) if latencies else 0.0,
+                "statuses": {str(s): n for s, n in statuses.items()}
+            }
+        return rows
+
+
+def print_stage(label, rows, rss, backlog=None):
+    print(f"\n=== {label} ===")
+    print(f"{'endpoint':<8} {'reqs':>6} {'ok rps':>8} {'err%':>6} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}  statuses")
+    for kind, row in rows.items():
+        print(f"{kind:<8} {row['requests']:>6} {row['throughput_rps']:>8.2f} {row['error_rate'] * 100:>5.1f}% "
+              f"{row['p50_ms']:>7.0f}ms {row['p90_ms']:>7.0f}ms {row['p99_ms']:>7.0f}ms {row['max_ms']:>7.0f}ms  {row['statuses']}")
+    if backlog is not None:
+        print(f"backlog at end of arrivals: {backlog['requests']} requests outstanding, drained in {backlog['drain_s']:.1f}s")
+    if rss:
+        values = [mb for _, mb in rss]
+        print(f"server RSS: start {values[0]:.0f} MB, peak {max(values):.0f} MB, end {values[-1]:.0f} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the corrosion detection API")
+    parser.add_argument("--url", help="Target an already running server instead of spawning one")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes (spawned server)")
+    parser.add_argument("--inference-workers", type=int, default=1, help="INFERENCE_WORKERS executor threads")
+    parser.add_argument("--max-inflight", type=int, default=0, help="MAX_INFLIGHT_UPLOADS (0 = server default)")
+    parser.add_argument("--stub-latency-ms", type=float, default=50)
+    parser.add_argument("--concurrency", type=int, default=16,
+                        help="Closed-loop client threads (open loop never caps outstanding requests)")
+    parser.add_argument("--rate", type=float, default=0, help="Poisson arrivals per second (0 = closed loop)")
+    parser.add_argument("--ramp", help="Comma-separated rates, one stage each, to find the saturation point")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds (per stage with --ramp)")
+    parser.add_argument("--stage-seconds", type=float, help="Alias for --duration when ramping")
+    parser.add_argument("--mix", default="upload=5,list=2,export=1,static=2", help="Request mix weights")
+    parser.add_argument("--sizes", default="640x480=5,1920x1080=3,4000x3000=2", help="Upload size mix weights")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--json", help="Write the full report to this file")
+    parser.add_argument("--server-output", action="store_true", help="Show the spawned server's logs")
+    args = parser.parse_args()
+
+    random.seed(0)
+    images = {}
+    for size in parse_weights(args.sizes):
+        width, height = (int(v) for v in size.split("x"))
+        images[size] = [make_image((width, height), rusty=i % 2 == 0) for i in range(4)]
+    print(f"🖼️  Prepared upload images: {', '.join(f'{s} ({len(images[s][0]) // 1024} KB)' for s in images)}")
+
+    server = None
+    if args.url:
+        url = args.url.rstrip("/")
+    else:
+        server = Server(args)
+        url = server.url
+        print(f"🚀 Started stub server at {url} (workers={args.workers}, inference workers={args.inference_workers}, "
+              f"stub latency={args.stub_latency_ms:.0f} ms)")
+
+    rates = [float(r) for r in args.ramp.split(",")] if args.ramp else [args.rate]
+    duration = args.stage_seconds or args.duration
+    report = {"url": url, "args": vars(args), "stages": []}
+
+    try:
+        for rate in rates:
+            run = LoadRun(url, args, images)
+            rss = []
+            stop_sampling = threading.Event()
+
+            def sample():
+                start = time.time()
+                while not stop_sampling.is_set():
+                    rss.append((time.time() - start, server.rss_mb()))
+                    stop_sampling.wait(1)
+
+            sampler = threading.Thread(target=sample, daemon=True) if server else None
+            if sampler:
+                sampler.start()
+            started = time.perf_counter()
+            run.run(rate, duration)
+            elapsed = time.perf_counter() - started
+            stop_sampling.set()
+            if sampler:
+                sampler.join()
+
+            rows = run.report(elapsed)
+            backlog = {"requests": run.backlog, "drain_s": run.drain_s} if rate > 0 else None
+            label = f"rate {rate:g}/s" if rate > 0 else f"closed loop, {args.concurrency} clients"
+            print_stage(f"{label}, {elapsed:.0f}s", rows, rss, backlog)
+            report["stages"].append({"rate": rate, "elapsed_s": elapsed, "endpoints": rows, "backlog": backlog, "rss_mb": rss})
+    finally:
+        if server:
+            server.stop()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n📄 Report written to {args.json}")
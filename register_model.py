@@ -0,0 +1,39 @@
+# register_model.py
+#
+# Add trained weights to the model registry (models/registry/ by default).
+#
+#   python register_model.py corrosion_detection/yolov8_segmentation_run/weights/best.pt --version v3 --notes "May retrain"
+#   python register_model.py best.pt --activate      # running servers pick it up within REGISTRY_POLL_SECONDS
+#   python register_model.py --list
+#
+# Activating from here only updates active.json; each API worker notices the
+# change, loads and warms the new weights in the background and swaps them in
+# between requests. POST /admin/models/{version}/activate does the same over HTTP.
+
+import argparse
+import json
+
+import app.registry as registry
+
+parser = argparse.ArgumentParser(description="Register model weights")
+parser.add_argument("weights", nargs="?", help="Path to a .pt file")
+parser.add_argument("--version", help="Version name (default: timestamp)")
+parser.add_argument("--notes", help="Free-form description")
+parser.add_argument("--metrics", help='JSON metrics, e.g. \'{"mAP50": 0.71}\'')
+parser.add_argument("--activate", action="store_true", help="Make this the active version")
+parser.add_argument("--list", action="store_true", help="List registered versions")
+args = parser.parse_args()
+
+if args.list:
+    active = registry.read_active()["active"]
+    for meta in registry.list_versions():
+        marker = "*" if meta["version"] == active else " "
+        print(f"{marker} {meta['version']:<20} {meta['created_at']}  {meta.get('notes') or ''}")
+elif args.weights:
+    meta = registry.register(args.weights, args.version, args.notes, json.loads(args.metrics) if args.metrics else None)
+    print(f"✅ Registered {meta['version']} in {registry.REGISTRY_DIR}/")
+    if args.activate:
+        registry.set_active(meta["version"])
+        print(f"🔁 {meta['version']} is now the active version")
+else:
+    parser.error("give a weights file or --list")
@@ -0,0 +1,62 @@
+# startup_report.py
+#
+# Break down cold-start cost of the API by module.
+#
+#   python startup_report.py            # import cost of app.main, grouped by top-level package
+#   python startup_report.py --init     # ...plus database init and model load, as run at startup
+#
+# Uses `python -X importtime` in a fresh interpreter so nothing is cached.
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def import_times(module):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_DIR, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr)
+
+    by_package = defaultdict(float)
+    total_us = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        # Nesting is shown by indentation; the module's own time is what we sum
+        by_package[name.strip().split(".")[0]] += int(self_us)
+        if not name.startswith("  "):
+            total_us += int(cumulative_us)
+    return total_us / 1000, {k: v / 1000 for k, v in by_package.items()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report API cold-start cost")
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--init", action="store_true", help="Also time database init and model load")
+    args = parser.parse_args()
+
+    total_ms, packages = import_times(args.module)
+    print(f"⏱️  import {args.module}: {total_ms:.0f} ms")
+    for name, ms in sorted(packages.items(), key=lambda kv: -kv[1])[:args.top]:
+        print(f"   {name:<24} {ms:>8.1f} ms")
+
+    if args.init:
+        sys.path.insert(0, REPO_DIR)
+        os.chdir(REPO_DIR)
+        import app.main as main
+
+        for stage, fn in (("database", main.init_database), ("model", main.warm_model)):
+            start = time.perf_counter()
+            fn()
+            print(f"⏱️  init {stage}: {(time.perf_counter() - start) * 1000:.0f} ms"
+                  + (f"  ❌ {main.startup_report['errors'][stage]}" if stage in main.startup_report["errors"] else ""))